@@ -0,0 +1,78 @@
+"""In-process TTL cache with single-flight coalescing for expensive async calls."""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+def query_key(query: str) -> str:
+    """Cache key for a user query: case- and surrounding-whitespace-insensitive."""
+    return hashlib.sha256(query.strip().lower().encode()).hexdigest()
+
+
+class AsyncTTLCache:
+    """
+    Caches the results of async factories for ttl seconds (LRU-bounded).
+    Concurrent misses for the same key share one in-flight call instead of each
+    running the factory, so a burst of identical requests costs a single call.
+    Exceptions are propagated to every waiter and never cached.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value for key, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value for key (no-op when the TTL is zero)."""
+        if self._ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self._ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_create(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        cache_if: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        """
+        Return the cached value for key, joining an in-flight call or starting one on a miss.
+        The result is cached only when cache_if (if given) accepts it.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t, cache_if))
+        # Shield so one cancelled waiter does not cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task, cache_if: Callable[[Any], bool] | None) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if value is not None and (cache_if is None or cache_if(value)):
+            self.set(key, value)
@@ -1,63 +1,194 @@
 """Checkpoint persistence utilities."""
+import atexit
+import functools
+import hashlib
 import logging
-import pickle
+import os
+import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
+import ormsgpack
+import zstandard
+from pydantic import ValidationError
 from backend.app.agent.state import AgentState
 from backend.app.config import CHECKPOINT_DIR
 
 logger = logging.getLogger(__name__)
 
+# ormsgpack walks pydantic models natively (no model_dump round trip), and the
+# model's compiled core validator is reused for every load.
+_PACK_OPTIONS = ormsgpack.OPT_SERIALIZE_PYDANTIC
+_STATE_VALIDATOR = AgentState.__pydantic_validator__
 
+# Zstd dictionary trained on real AgentState checkpoints: the repeated schema keys
+# and citation/history structure compress far better against it than from scratch.
+_ZSTD_LEVEL = 3
+_ZSTD_DICT = zstandard.ZstdCompressionDict(Path(__file__).with_name("checkpoint.zdict").read_bytes())
+_ZSTD_DICT.precompute_compress(level=_ZSTD_LEVEL)
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Digest of the last buffer queued per checkpoint path, used to skip rewriting identical state.
+# LRU-bounded like _path, so long-running servers do not keep one entry per session forever.
+_LAST_HASH: OrderedDict[Path, bytes] = OrderedDict()
+_LAST_HASH_MAXSIZE = 1024
+
+
+@functools.lru_cache(maxsize=1024)
 def _path(session_id: str) -> Path:
-    """Get checkpoint file path for a session."""
-    return CHECKPOINT_DIR / f"{session_id}.pkl"
+    """Get checkpoint file path for a session (cached, since hot sessions save repeatedly)."""
+    return CHECKPOINT_DIR / f"{session_id}.ckpt"
+
+
+def _write_atomic(file_path: Path, data: bytes) -> None:
+    """
+    Write data to a temp file in the target directory, fsync it and swap it in.
+    Readers see either the old checkpoint or the new one, never a torn write.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, suffix=".tmp")
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    os.close(fd)
+    os.replace(tmp_path, file_path)
+
+
+class _CheckpointWriter:
+    """
+    Daemon thread that persists encoded checkpoints off the caller's thread.
+    Pending writes are keyed by path, so a burst of saves for one session
+    collapses into a single write of the latest state.
+    """
+
+    def __init__(self, max_pending: int = 256):
+        self._pending: dict[Path, bytes] = {}
+        self._max_pending = max_pending
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        # Only the writer thread compresses, so a single compressor can be reused
+        self._compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL, dict_data=_ZSTD_DICT)
+
+    def submit(self, file_path: Path, data: bytes) -> None:
+        """Queue data for file_path, replacing any write still waiting for it."""
+        with self._cond:
+            # Backpressure: only block when a new path would overflow the queue
+            self._cond.wait_for(
+                lambda: file_path in self._pending or len(self._pending) < self._max_pending
+            )
+            self._pending[file_path] = data
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def pending(self, file_path: Path) -> bytes | None:
+        """Return the not-yet-persisted (uncompressed) data for file_path, if any."""
+        with self._cond:
+            return self._pending.get(file_path)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every queued write has finished. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                file_path, data = next(iter(self._pending.items()))
+
+            try:
+                _write_atomic(file_path, self._compressor.compress(data))
+            except (OSError, zstandard.ZstdError) as e:
+                logger.error(f"Failed to write checkpoint {file_path.name}: {e}")
+                # Forget the digest so the next save of the same state retries the write
+                _LAST_HASH.pop(file_path, None)
+            except Exception as e:
+                # Never let the writer thread die: queued writes (and flush) would wait forever
+                logger.error(f"Unexpected error writing checkpoint {file_path.name}: {e}", exc_info=True)
+                _LAST_HASH.pop(file_path, None)
+
+            with self._cond:
+                if self._pending.get(file_path) is data:
+                    del self._pending[file_path]
+                else:
+                    # Superseded while writing: requeue at the back so other sessions are not starved
+                    self._pending[file_path] = self._pending.pop(file_path)
+                self._cond.notify_all()
+
+
+# Longest the interpreter waits at exit for queued checkpoints to reach disk
+_EXIT_FLUSH_TIMEOUT = 10.0
+
+_WRITER = _CheckpointWriter()
+atexit.register(functools.partial(_WRITER.flush, timeout=_EXIT_FLUSH_TIMEOUT))
+
+
+def flush_checkpoints(timeout: float | None = None) -> bool:
+    """Wait for queued checkpoint writes to reach disk. Returns False on timeout."""
+    return _WRITER.flush(timeout)
 
 
 def save_checkpoint(session_id: str, state: AgentState | dict) -> None:
     """
     Persist AgentState to disk.
     Accepts both AgentState objects and dicts (for LangGraph compatibility).
+    Dicts are validated into AgentState first so every checkpoint has the same shape.
+    The state is encoded on the calling thread; the disk write happens on the
+    background writer, so write failures are logged rather than raised.
+    Saving a state identical to the last one saved for the session is a no-op.
     """
     file_path = _path(session_id)
     try:
-        # Convert AgentState to dict for consistent storage
-        if isinstance(state, AgentState):
-            state_to_save = state.model_dump(mode="python")
-        elif isinstance(state, dict):
-            state_to_save = state
-        else:
-            raise TypeError(f"Expected AgentState or dict, got {type(state)}")
-        
-        with open(file_path, "wb") as f:
-            pickle.dump(state_to_save, f)
-        logger.debug(f"Saved checkpoint for session: {session_id}")
-    except (OSError, IOError, pickle.PicklingError) as e:
+        if not isinstance(state, AgentState):
+            state = _STATE_VALIDATOR.validate_python(state)
+        data = ormsgpack.packb(state, option=_PACK_OPTIONS)
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if _LAST_HASH.get(file_path) == digest:
+            logger.debug(f"Checkpoint unchanged for session: {session_id}")
+            return
+        # Re-insert rather than move_to_end: the writer thread may drop the entry concurrently
+        _LAST_HASH.pop(file_path, None)
+        _LAST_HASH[file_path] = digest
+        if len(_LAST_HASH) > _LAST_HASH_MAXSIZE:
+            _LAST_HASH.popitem(last=False)
+        _WRITER.submit(file_path, data)
+        logger.debug(f"Queued checkpoint for session: {session_id}")
+    except ValidationError as e:
+        raise TypeError(f"Expected AgentState or AgentState-compatible dict: {e}") from e
+    except ormsgpack.MsgpackEncodeError as e:
         logger.error(f"Failed to save checkpoint for session {session_id}: {e}")
         raise RuntimeError(f"Failed to save checkpoint for session {session_id}: {e}") from e
 
 
-def load_checkpoint(session_id: str) -> AgentState | dict | None:
+def load_checkpoint(session_id: str) -> AgentState | None:
     """
     Load checkpoint if it exists, else None.
-    Returns dict (for compatibility with old checkpoints) or AgentState.
-    Caller should normalize to AgentState using _normalize_state if needed.
+    Writes still queued for the session are visible immediately.
+    Unreadable or invalid checkpoints are logged and treated as missing.
     """
     file_path = _path(session_id)
-    if not file_path.exists():
+    data = _WRITER.pending(file_path)
+    if data is None and not file_path.exists():
         return None
-    
+
     try:
-        with open(file_path, "rb") as f:
-            loaded = pickle.load(f)
-            
-        # Return as-is (could be dict or AgentState)
-        # The caller should normalize it
-        return loaded
-    except (FileNotFoundError, IOError, pickle.UnpicklingError) as e:
+        if data is None:
+            data = file_path.read_bytes()
+            # Checkpoints written before compression was added are plain msgpack
+            if data.startswith(_ZSTD_MAGIC):
+                data = zstandard.ZstdDecompressor(dict_data=_ZSTD_DICT).decompress(data)
+        return _STATE_VALIDATOR.validate_python(ormsgpack.unpackb(data))
+    except (OSError, zstandard.ZstdError, ormsgpack.MsgpackDecodeError, ValidationError) as e:
         logger.warning(f"Failed to load checkpoint for {session_id}: {e}")
         # Return None to allow graceful degradation
         return None
     except Exception as e:
         logger.error(f"Unexpected error loading checkpoint for {session_id}: {e}", exc_info=True)
         return None
-
@@ -0,0 +1,16 @@
+"""Process-wide clients for upstream APIs, shared by the graph nodes and the API."""
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from backend.app.config import OPENAI_API_KEY, OPENAI_TIMEOUT
+
+# One OpenAI client per process: every caller reuses the same pooled keep-alive
+# connections, multiplexed over HTTP/2, with the same timeout. None without a key
+# (config.py reads the OPEN_AI_KEY env var but exports it as OPENAI_API_KEY).
+openai_client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    timeout=OPENAI_TIMEOUT,
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    ),
+) if OPENAI_API_KEY else None
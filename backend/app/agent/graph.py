@@ -1,17 +1,21 @@
 """LangGraph workflow definition for the Fleetline Agent."""
+import functools
 from langgraph.graph import StateGraph, END
 from backend.app.agent.state import AgentState
 from backend.app.agent.nodes.search import search
 from backend.app.agent.nodes.synthesize import synthesize
+from backend.app.agent.nodes.rank_and_synthesize import rank_and_synthesize
 from backend.app.agent.nodes.enrich_images import enrich_images
 from backend.app.agent.nodes.format_output import format_output
+from backend.app.config import RANK_SOURCES
 
 
 def build_graph():
     """Compile LangGraph workflow connecting all agent nodes."""
     g = StateGraph(AgentState)
     g.add_node("search", search)
-    g.add_node("synthesize", synthesize)
+    # With RANK_SOURCES the answer step also ranks sources, still in a single LLM call
+    g.add_node("synthesize", rank_and_synthesize if RANK_SOURCES else synthesize)
     g.add_node("enrich_images", enrich_images)
     g.add_node("format_output", format_output)
 
@@ -24,3 +28,10 @@ def build_graph():
     g.set_entry_point("search")
     return g.compile()
 
+
+# Compiling takes a few milliseconds, and the compiled graph holds node closures that
+# cannot be pickled, so it is rebuilt per process rather than cached on disk.
+@functools.cache
+def get_graph():
+    """Return the compiled workflow, compiling it on first use and sharing it afterwards."""
+    return build_graph()
@@ -2,6 +2,13 @@
 import logging
 from typing import Optional
 
+# Log level for each step status; anything else (start, end, info, ...) logs at INFO
+_STATUS_LEVELS = {
+    "debug": logging.DEBUG,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
 
 class AgentLogger:
     """Lightweight wrapper around Python logging for pipeline steps."""
@@ -10,20 +17,28 @@ class AgentLogger:
         self._logger = logging.getLogger("agent")
         self._context = context
 
-    def _compose_message(self, step: str, status: str, message: str = "") -> str:
-        parts = [
-            f"step={step}",
-            f"status={status}",
-        ]
+    @property
+    def debug_enabled(self) -> bool:
+        """Whether debug-status messages would be emitted (lets callers skip building them)."""
+        return self._logger.isEnabledFor(logging.DEBUG)
+
+    def emit(self, step: str, status: str, message: str = "", exc_info: BaseException | None = None) -> None:
+        """
+        Emit a structured log message at the level matching its status, with exc_info's traceback if given.
+        Formatting is deferred to the logging module, so suppressed messages cost a level check.
+        """
+        level = _STATUS_LEVELS.get(status, logging.INFO)
+        if not self._logger.isEnabledFor(level):
+            return
+        fmt = "step=%s | status=%s"
+        args = [step, status]
         if self._context:
-            parts.append(f"context={self._context}")
+            fmt += " | context=%s"
+            args.append(self._context)
         if message:
-            parts.append(f"message={message}")
-        return " | ".join(parts)
-
-    def emit(self, step: str, status: str, message: str = "") -> None:
-        """Emit a structured log message."""
-        self._logger.info(self._compose_message(step, status, message))
+            fmt += " | message=%s"
+            args.append(message)
+        self._logger.log(level, fmt, *args, exc_info=exc_info)
 
     def start(self, step: str) -> None:
         """Log the start of a step."""
@@ -35,5 +50,4 @@ class AgentLogger:
 
     def error(self, step: str, msg: str) -> None:
         """Log an error for a step."""
-        self._logger.error(self._compose_message(step, "error", msg))
-
+        self.emit(step, "error", msg)
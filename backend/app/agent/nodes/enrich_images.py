@@ -1,22 +1,247 @@
 """Image enrichment node: Fetches images for each citation using BrightData SERP image search."""
-import json
-from urllib.parse import quote, urlparse
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from backend.app.agent.state import AgentState, Citation
+import asyncio
+import html
+import ipaddress
+import re
+import socket
+from collections import OrderedDict
+from urllib.parse import urlencode, urljoin, urlparse
+import httpcore
+import httpx
+import orjson
+from backend.app.agent.state import AgentState
 from backend.app.agent.logging import AgentLogger
 from backend.app.config import (
     BRIGHT_DATA_API_KEY,
     SERPAPI_API_KEY,
     SERP_ZONE,
     HTTP_TIMEOUT_SEARCH,
+    HTTP_TIMEOUT_IMAGE,
+    HTTP_USER_AGENT,
+    HTML_CHUNK_SIZE,
+    HTML_MAX_SIZE,
+    IMAGE_SEARCH_DEADLINE,
 )
 
+_URL_SCHEMES = ("http://", "https://")
+_DATA_IMAGE_PREFIX = "data:image"
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".bmp")
 
-def _search_image_for_citation(citation_title: str, query_context: str, api_key: str, zone: str, logger: AgentLogger, citation_url: str | None = None) -> str | None:
+# Fixed Google image search parameters (tbm=isch) plus brd_json=1 for BrightData's parsed JSON output
+_IMAGE_SEARCH_BASE = "https://www.google.com/search?"
+_IMAGE_SEARCH_PARAMS = {"tbm": "isch", "hl": "en", "gl": "us", "num": 10, "brd_json": 1}
+
+# Image result fields to try, in order of preference.
+# 'link' is skipped: it's usually the hosting page, not the image itself.
+_IMAGE_FIELDS = ("original", "url", "src", "thumbnail", "image")
+
+# Substrings marking a result URL as a web page rather than an image.
+# One precompiled alternation scans the URL once in C instead of a Python loop
+# of substring checks over a lowercased copy.
+_PAGE_URL_RE = re.compile(
+    "|".join(map(re.escape, ("/wiki/", ".html", "/discover/", "/article/", "/page/", "?q="))),
+    re.IGNORECASE,
+)
+# Image CDN hosts and path segments that identify a thumbnail as an image URL
+_IMAGE_HOST_RE = re.compile(
+    "|".join(map(re.escape, (
+        "googleusercontent.com", "gstatic.com", "imgur.com", "images.unsplash.com", "/image/", "/img/",
+    ))),
+    re.IGNORECASE,
+)
+
+# Page image markup, matched on raw bytes: only these two values are needed from a
+# citation page, so there is no decode or parse tree. og:image attributes come in either order.
+_OG_RE = re.compile(
+    rb"""<meta\s[^>]*?(?:property|name)\s*=\s*["']og:image(?::url|:secure_url)?["'][^>]*?content\s*=\s*["']([^"']+)"""
+    rb"""|<meta\s[^>]*?content\s*=\s*["']([^"']+)["'][^>]*?(?:property|name)\s*=\s*["']og:image(?::url|:secure_url)?["']""",
+    re.IGNORECASE,
+)
+_IMG_RE = re.compile(rb"""<img\s[^>]*?src\s*=\s*["']([^"']+)""", re.IGNORECASE)
+
+# Images found for recent citation searches, keyed on (image query, citation host, zone).
+# Lives at module scope so repeated sources across requests skip the BrightData round trip.
+_IMAGE_CACHE: OrderedDict[tuple[str, str, str], str] = OrderedDict()
+_IMAGE_CACHE_MAXSIZE = 1024
+# Searches currently running, so a source cited twice in one answer is looked up once
+_IN_FLIGHT: dict[tuple[str, str, str], asyncio.Task] = {}
+
+
+def _image_search_url(image_query: str) -> str:
+    """Build the Google image search URL BrightData should fetch for image_query."""
+    return _IMAGE_SEARCH_BASE + urlencode({"q": image_query, **_IMAGE_SEARCH_PARAMS})
+
+
+def _pick_image_url(images: object, limit: int) -> str | None:
+    """
+    Return the first usable image URL among the first `limit` image search results.
+    Since these come from image search (tbm=isch), any http(s) URL is trusted unless
+    it is clearly a web page; base64 data URIs are accepted as-is.
+    """
+    if not isinstance(images, list):
+        return None
+    for image_item in images[:limit]:
+        if not isinstance(image_item, dict):
+            continue
+        img_url = None
+        for field in _IMAGE_FIELDS:
+            img_url = image_item.get(field)
+            if img_url:
+                break
+        if not isinstance(img_url, str):
+            continue
+        if img_url.startswith(_URL_SCHEMES):
+            # Reject obvious page URLs (HTML pages, Wikipedia articles, etc.)
+            if _PAGE_URL_RE.search(img_url):
+                continue
+            return img_url
+        if img_url.startswith(_DATA_IMAGE_PREFIX):
+            return img_url
+    return None
+
+
+# Upper bound on concurrent BrightData connections across all enrichment passes
+_MAX_CONNECTIONS = 32
+
+# Process-wide client: searches in _IN_FLIGHT are joined across requests, so they must not
+# run on a client owned by (and closed with) the pass that happened to start them.
+# Keep-alive connections are reused across passes (over HTTP/2 where the server supports it);
+# connection failures are retried twice. Closed by the API on shutdown, like page_http_client.
+http_client = httpx.AsyncClient(
+    timeout=HTTP_TIMEOUT_SEARCH,
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_connections=_MAX_CONNECTIONS),
+    ),
+)
+
+
+def _page_image_url(page: bytes, base_url: str) -> str | None:
+    """Return the page's og:image, else its first <img> src, as an absolute http(s) URL."""
+    match = _OG_RE.search(page) or _IMG_RE.search(page)
+    if match is None:
+        return None
+    raw = match.group(1) or match.group(2)
+    img_url = urljoin(base_url, html.unescape(raw.decode("utf-8", "replace")).strip())
+    return img_url if img_url.startswith(_URL_SCHEMES) else None
+
+
+# Redirects followed (each hop re-checked) when fetching a cited page
+_MAX_PAGE_REDIRECTS = 3
+
+
+def _is_global_address(address: str) -> bool:
+    """Whether address is a publicly routable IP (not loopback, private, link-local, metadata, ...)."""
+    try:
+        return ipaddress.ip_address(address).is_global
+    except ValueError:
+        return False
+
+
+class _PublicAddressBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend for cited-page fetches that resolves each host itself and connects
+    only when every address is publicly routable. It dials the address it checked, so a
+    host answering DNS differently on a second lookup (DNS rebinding) cannot steer the
+    connection to an internal address; TLS SNI and the Host header keep the hostname.
+    """
+
+    def __init__(self) -> None:
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except (OSError, UnicodeError) as e:
+            raise httpcore.ConnectError(f"Could not resolve {host}: {e}") from e
+        addresses = [info[4][0] for info in infos]
+        if not addresses or not all(map(_is_global_address, addresses)):
+            raise httpcore.ConnectError(f"Refusing to connect to non-public host {host}")
+        return await self._backend.connect_tcp(
+            addresses[0], port, timeout=timeout, local_address=local_address, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class _PublicOnlyTransport(httpx.AsyncHTTPTransport):
+    """AsyncHTTPTransport whose connections go through _PublicAddressBackend."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        # httpx has no public option for the httpcore network backend, so set it on the pool
+        self._pool._network_backend = _PublicAddressBackend()
+
+
+# Process-wide client for fetching cited pages. Environment proxies are ignored
+# (trust_env=False): a proxy would resolve hosts itself, bypassing the address check.
+page_http_client = httpx.AsyncClient(
+    trust_env=False,
+    transport=_PublicOnlyTransport(http2=True, limits=httpx.Limits(max_connections=_MAX_CONNECTIONS)),
+)
+
+
+def _is_public_url(url: httpx.URL) -> bool:
+    """
+    Cheap pre-check that url is http(s) and does not name a non-public IP literal.
+    Hostnames are resolved and checked at connect time by _PublicAddressBackend.
+    """
+    if url.scheme not in ("http", "https") or not url.host:
+        return False
+    try:
+        ipaddress.ip_address(url.host)
+    except ValueError:
+        return True
+    return _is_global_address(url.host)
+
+
+async def _fetch_page_image(citation_url: str, logger: AgentLogger) -> str | None:
+    """
+    Look for an image in the first HTML_MAX_SIZE bytes of the cited page itself.
+    The page is streamed in HTML_CHUNK_SIZE chunks and the download stops as soon as
+    an og:image tag has arrived, which is usually within the first chunk (<head>).
+    Only public hosts are fetched (via page_http_client); redirects are followed by hand so each hop is checked too.
+    """
+    page = bytearray()
+    try:
+        url = httpx.URL(citation_url)
+        for _ in range(_MAX_PAGE_REDIRECTS + 1):
+            if not _is_public_url(url):
+                if logger.debug_enabled:
+                    logger.emit("enrich_images", "debug", f"Skipping page image lookup for non-public URL: {str(url)[:60]}")
+                return None
+            async with page_http_client.stream(
+                "GET",
+                url,
+                headers={"User-Agent": HTTP_USER_AGENT},
+                timeout=HTTP_TIMEOUT_IMAGE,
+            ) as response:
+                if response.has_redirect_location:
+                    url = url.join(response.headers["Location"])
+                    continue
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(HTML_CHUNK_SIZE):
+                    page += chunk
+                    if len(page) >= HTML_MAX_SIZE or _OG_RE.search(page):
+                        break
+                break
+        else:
+            return None
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        if logger.debug_enabled:
+            logger.emit("enrich_images", "debug", f"Page image lookup failed for {citation_url[:60]}: {str(e)[:100]}")
+        return None
+    return _page_image_url(bytes(page[:HTML_MAX_SIZE]), str(url))
+
+
+async def _search_image_for_citation(client: httpx.AsyncClient, citation_title: str, query_context: str, api_key: str, zone: str, logger: AgentLogger, citation_url: str | None = None, fetch_page: bool = False) -> str | None:
     """
     Search for an image using BrightData SERP API image search.
     Returns the first image URL found, or None if no image is found.
+    With fetch_page, the cited page itself is also checked for an image.
+    Found images are cached, and identical searches already in progress are shared.
     """
     # Build image search query - combine citation title with query context for better results
     # Extract key terms from query context (first few words)
@@ -32,10 +257,41 @@ def _search_image_for_citation(citation_title: str, query_context: str, api_key:
     # Clean up the query - remove common stopwords and limit length
     image_query = image_query.strip()[:100]  # Limit to 100 chars
     
-    logger.emit("enrich_images", "debug", f"Image search query: {image_query[:80]}")
+    # The host is part of the key because it drives the domain fallback search
+    key = (image_query, urlparse(citation_url).netloc if citation_url else "", zone)
+    cached = _IMAGE_CACHE.get(key)
+    if cached is not None:
+        _IMAGE_CACHE.move_to_end(key)
+        if logger.debug_enabled:
+            logger.emit("enrich_images", "debug", f"Image cache hit: {image_query[:80]}")
+        return cached
+    
+    task = _IN_FLIGHT.get(key)
+    if task is None:
+        # The deadline bounds the whole search, so one slow host cannot hold up the batch
+        task = asyncio.ensure_future(asyncio.wait_for(
+            _fetch_citation_image(client, image_query, citation_title, api_key, zone, logger, citation_url, fetch_page),
+            IMAGE_SEARCH_DEADLINE,
+        ))
+        _IN_FLIGHT[key] = task
+        task.add_done_callback(lambda _: _IN_FLIGHT.pop(key, None))
+    try:
+        image_url = await asyncio.shield(task)
+    except asyncio.TimeoutError:
+        logger.emit("enrich_images", "warning", f"Image search timed out for '{citation_title[:50]}'")
+        return None
     
-    # Build Google image search URL (tbm=isch for image search)
-    search_url = f"https://www.google.com/search?q={quote(image_query)}&tbm=isch&hl=en&gl=us&num=10"
+    if image_url:
+        _IMAGE_CACHE[key] = image_url
+        if len(_IMAGE_CACHE) > _IMAGE_CACHE_MAXSIZE:
+            _IMAGE_CACHE.popitem(last=False)
+    return image_url
+
+
+async def _fetch_citation_image(client: httpx.AsyncClient, image_query: str, citation_title: str, api_key: str, zone: str, logger: AgentLogger, citation_url: str | None, fetch_page: bool) -> str | None:
+    """Run the BrightData image search (and domain fallback) for a prepared image query."""
+    if logger.debug_enabled:
+        logger.emit("enrich_images", "debug", f"Image search query: {image_query[:80]}")
     
     headers = {
         "Content-Type": "application/json",
@@ -45,54 +301,30 @@ def _search_image_for_citation(citation_title: str, query_context: str, api_key:
     
     payload = {
         "zone": zone,
-        "url": f"{search_url}&brd_json=1",
+        "url": _image_search_url(image_query),
         "format": "json",
     }
     
     try:
-        response = requests.post(
+        response = await client.post(
             "https://api.brightdata.com/request",
             headers=headers,
             json=payload,
-            timeout=HTTP_TIMEOUT_SEARCH
         )
         response.raise_for_status()
-        api_response = response.json()
+        api_response = orjson.loads(response.content)
         
         # Extract body
         body = api_response.get("body", {})
-        if isinstance(body, str):
-            body = json.loads(body)
+        if isinstance(body, (str, bytes)):
+            body = orjson.loads(body)
         
-        # Extract first image from image search results
-        images = body.get("images", [])
-        if isinstance(images, list) and len(images) > 0:
-            # Try first few images in case first one fails
-            for image_item in images[:5]:
-                if isinstance(image_item, dict):
-                    # Try different image URL fields in order of preference
-                    # Skip 'link' field as it's usually a page URL, not an image URL
-                    img_url = (
-                        image_item.get("original") or 
-                        image_item.get("url") or
-                        image_item.get("src") or
-                        image_item.get("thumbnail") or
-                        image_item.get("image")
-                    )
-                    # For image search results, accept any URL unless it's clearly a page URL
-                    if img_url and isinstance(img_url, str):
-                        if img_url.startswith(('http://', 'https://')):
-                            # Reject obvious page URLs (HTML pages, Wikipedia articles, etc.)
-                            if any(blocker in img_url.lower() for blocker in ['/wiki/', '.html', '/discover/', '/article/', '/page/', '?q=']):
-                                continue
-                            # Since we're doing image search (tbm=isch), trust the results
-                            # Accept the URL (we've already filtered out page URLs above)
-                            logger.emit("enrich_images", "debug", f"Found image URL: {img_url[:60]}...")
-                            return img_url
-                        elif img_url.startswith('data:image'):
-                            # Base64 image data URI
-                            logger.emit("enrich_images", "debug", "Found base64 image data")
-                            return img_url
+        # Extract first image from image search results (try first few in case one is unusable)
+        img_url = _pick_image_url(body.get("images"), 5)
+        if img_url:
+            if logger.debug_enabled:
+                logger.emit("enrich_images", "debug", f"Found image URL: {img_url[:60]}...")
+            return img_url
         
         # Fallback: try organic results with thumbnails (but validate they're image URLs)
         organic_results = body.get("organic", [])
@@ -100,14 +332,20 @@ def _search_image_for_citation(citation_title: str, query_context: str, api_key:
             if isinstance(result, dict):
                 thumbnail = result.get("thumbnail")
                 if thumbnail and isinstance(thumbnail, str):
-                    if thumbnail.startswith(('http://', 'https://')):
+                    if thumbnail.startswith(_URL_SCHEMES):
                         # Validate it's an image URL
-                        if (any(thumbnail.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp']) or
-                            any(domain in thumbnail.lower() for domain in ['googleusercontent.com', 'gstatic.com', 'imgur.com', 'i.imgur.com', 'images.unsplash.com']) or
-                            '/image/' in thumbnail.lower() or '/img/' in thumbnail.lower() or
-                            thumbnail.startswith('data:image')):
+                        if thumbnail.lower().endswith(_IMAGE_EXTENSIONS) or _IMAGE_HOST_RE.search(thumbnail):
                             return thumbnail
         
+        # Next, the cited page's own og:image / first <img> (a direct fetch, no SERP call).
+        # Only for URLs that came from the search results, never ones invented by the LLM.
+        if fetch_page and citation_url:
+            img_url = await _fetch_page_image(citation_url, logger)
+            if img_url:
+                if logger.debug_enabled:
+                    logger.emit("enrich_images", "debug", f"Found page image: {img_url[:60]}...")
+                return img_url
+        
         # Final fallback: if no image found and we have a citation URL, search by website name
         if citation_url:
             try:
@@ -117,66 +355,47 @@ def _search_image_for_citation(citation_title: str, query_context: str, api_key:
                 domain = domain.replace('www.', '').split('/')[0]
                 
                 if domain:
-                    logger.emit("enrich_images", "debug", f"Trying fallback search with domain: {domain}")
+                    if logger.debug_enabled:
+                        logger.emit("enrich_images", "debug", f"Trying fallback search with domain: {domain}")
                     # Search for images using just the domain/website name
-                    fallback_query = domain
-                    fallback_search_url = f"https://www.google.com/search?q={quote(fallback_query)}&tbm=isch&hl=en&gl=us&num=10"
-                    
                     fallback_payload = {
                         "zone": zone,
-                        "url": f"{fallback_search_url}&brd_json=1",
+                        "url": _image_search_url(domain),
                         "format": "json",
                     }
                     
-                    fallback_response = requests.post(
+                    fallback_response = await client.post(
                         "https://api.brightdata.com/request",
                         headers=headers,
                         json=fallback_payload,
-                        timeout=HTTP_TIMEOUT_SEARCH
                     )
                     fallback_response.raise_for_status()
-                    fallback_api_response = fallback_response.json()
+                    fallback_api_response = orjson.loads(fallback_response.content)
                     
                     fallback_body = fallback_api_response.get("body", {})
-                    if isinstance(fallback_body, str):
-                        fallback_body = json.loads(fallback_body)
+                    if isinstance(fallback_body, (str, bytes)):
+                        fallback_body = orjson.loads(fallback_body)
                     
                     # Get first image from fallback search
-                    fallback_images = fallback_body.get("images", [])
-                    if isinstance(fallback_images, list) and len(fallback_images) > 0:
-                        for image_item in fallback_images[:3]:  # Try first 3
-                            if isinstance(image_item, dict):
-                                img_url = (
-                                    image_item.get("original") or 
-                                    image_item.get("url") or
-                                    image_item.get("src") or
-                                    image_item.get("thumbnail") or
-                                    image_item.get("image")
-                                )
-                                if img_url and isinstance(img_url, str):
-                                    if img_url.startswith(('http://', 'https://')):
-                                        # Reject obvious page URLs
-                                        if any(blocker in img_url.lower() for blocker in ['/wiki/', '.html', '/discover/', '/article/', '/page/', '?q=']):
-                                            continue
-                                        logger.emit("enrich_images", "info", f"Found fallback image via domain search: {img_url[:60]}...")
-                                        return img_url
-                                    elif img_url.startswith('data:image'):
-                                        logger.emit("enrich_images", "info", "Found fallback base64 image via domain search")
-                                        return img_url
+                    img_url = _pick_image_url(fallback_body.get("images"), 3)
+                    if img_url:
+                        logger.emit("enrich_images", "info", f"Found fallback image via domain search: {img_url[:60]}...")
+                        return img_url
             except Exception as e:
-                logger.emit("enrich_images", "debug", f"Fallback domain search failed: {str(e)[:100]}")
+                if logger.debug_enabled:
+                    logger.emit("enrich_images", "debug", f"Fallback domain search failed: {str(e)[:100]}")
         
         return None
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.emit("enrich_images", "warning", f"Image search failed for '{citation_title[:50]}': {str(e)[:100]}")
         return None
-    except (json.JSONDecodeError, KeyError, TypeError) as e:
+    except (orjson.JSONDecodeError, KeyError, TypeError) as e:
         logger.emit("enrich_images", "warning", f"Image search parsing failed for '{citation_title[:50]}': {str(e)[:100]}")
         return None
 
 
-def _search_overview_image(query: str, api_key: str, zone: str, logger: AgentLogger) -> str | None:
+async def _search_overview_image(client: httpx.AsyncClient, query: str, api_key: str, zone: str, logger: AgentLogger) -> str | None:
     """
     Search for an overview image using BrightData SERP API image search.
     Returns the first image URL found, or None if no image is found.
@@ -184,10 +403,8 @@ def _search_overview_image(query: str, api_key: str, zone: str, logger: AgentLog
     # Build image search query from the main query
     image_query = query.strip()[:100]  # Limit to 100 chars
     
-    logger.emit("enrich_images", "debug", f"Overview image search query: {image_query[:80]}")
-    
-    # Build Google image search URL (tbm=isch for image search)
-    search_url = f"https://www.google.com/search?q={quote(image_query)}&tbm=isch&hl=en&gl=us&num=10"
+    if logger.debug_enabled:
+        logger.emit("enrich_images", "debug", f"Overview image search query: {image_query[:80]}")
     
     headers = {
         "Content-Type": "application/json",
@@ -197,74 +414,49 @@ def _search_overview_image(query: str, api_key: str, zone: str, logger: AgentLog
     
     payload = {
         "zone": zone,
-        "url": f"{search_url}&brd_json=1",
+        "url": _image_search_url(image_query),
         "format": "json",
     }
     
     try:
-        response = requests.post(
+        response = await client.post(
             "https://api.brightdata.com/request",
             headers=headers,
             json=payload,
-            timeout=HTTP_TIMEOUT_SEARCH
         )
         response.raise_for_status()
-        api_response = response.json()
+        api_response = orjson.loads(response.content)
         
         # Extract body
         body = api_response.get("body", {})
-        if isinstance(body, str):
-            body = json.loads(body)
+        if isinstance(body, (str, bytes)):
+            body = orjson.loads(body)
         
-        # Extract first image from image search results
-        images = body.get("images", [])
-        if isinstance(images, list) and len(images) > 0:
-            # Try first few images in case first one fails
-            for image_item in images[:5]:
-                if isinstance(image_item, dict):
-                    # Try different image URL fields in order of preference
-                    # Skip 'link' field as it's usually a page URL, not an image URL
-                    img_url = (
-                        image_item.get("original") or 
-                        image_item.get("url") or
-                        image_item.get("src") or
-                        image_item.get("thumbnail") or
-                        image_item.get("image")
-                    )
-                    # For image search results, accept any URL unless it's clearly a page URL
-                    if img_url and isinstance(img_url, str):
-                        if img_url.startswith(('http://', 'https://')):
-                            # Reject obvious page URLs (HTML pages, Wikipedia articles, etc.)
-                            if any(blocker in img_url.lower() for blocker in ['/wiki/', '.html', '/discover/', '/article/', '/page/', '?q=']):
-                                continue
-                            # Since we're doing image search (tbm=isch), trust the results
-                            # Accept if it looks like an image OR if it's from image search (which it always is here)
-                            if (any(img_url.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp', '.ico']) or
-                                any(domain in img_url.lower() for domain in ['googleusercontent.com', 'gstatic.com', 'imgur.com', 'i.imgur.com', 'images.unsplash.com', 'cdn', 'image', 'img', 'photo', 'pic']) or
-                                '/image/' in img_url.lower() or '/img/' in img_url.lower() or
-                                True):  # Always True - we're in image search, so trust results
-                                logger.emit("enrich_images", "debug", f"Found overview image URL: {img_url[:60]}...")
-                                return img_url
-                        elif img_url.startswith('data:image'):
-                            # Base64 image data URI
-                            logger.emit("enrich_images", "debug", "Found base64 overview image data")
-                            return img_url
+        # Extract first image from image search results (try first few in case one is unusable)
+        img_url = _pick_image_url(body.get("images"), 5)
+        if img_url:
+            if logger.debug_enabled:
+                logger.emit("enrich_images", "debug", f"Found overview image URL: {img_url[:60]}...")
+            return img_url
         
         return None
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.emit("enrich_images", "warning", f"Overview image search failed: {str(e)[:100]}")
         return None
-    except (json.JSONDecodeError, KeyError, TypeError) as e:
+    except (orjson.JSONDecodeError, KeyError, TypeError) as e:
         logger.emit("enrich_images", "warning", f"Overview image search parsing failed: {str(e)[:100]}")
         return None
 
 
-def enrich_images(state: AgentState) -> AgentState:
+async def enrich_images(state: AgentState) -> AgentState:
     """
     Enrich each citation with an image from BrightData SERP image search.
     Also fetches overview image if missing.
     Uses the citation title + query context to search for relevant images.
+    All searches, including the overview search, run concurrently on the
+    shared pooled async client so the pass takes about as long as the slowest search,
+    and each search is abandoned after IMAGE_SEARCH_DEADLINE seconds.
     """
     logger = AgentLogger()
     logger.start("enrich_images")
@@ -278,17 +470,13 @@ def enrich_images(state: AgentState) -> AgentState:
         logger.end("enrich_images")
         return state
     
-    # Fetch overview image if missing
+    # Decide whether an overview image search is needed
+    query = state.query or ""
+    search_overview = False
     if not state.overview_image:
-        logger.emit("enrich_images", "info", "No overview image found, searching for one...")
-        query = state.query or ""
         if query:
-            overview_image = _search_overview_image(query, api_key, zone, logger)
-            if overview_image:
-                state.overview_image = overview_image
-                logger.emit("enrich_images", "info", f"Found overview image: {overview_image[:50]}...")
-            else:
-                logger.emit("enrich_images", "warning", "Could not find overview image")
+            logger.emit("enrich_images", "info", "No overview image found, searching for one...")
+            search_overview = True
         else:
             logger.emit("enrich_images", "warning", "No query available for overview image search")
     else:
@@ -298,69 +486,69 @@ def enrich_images(state: AgentState) -> AgentState:
     citations = state.citations or []
     if not citations:
         logger.emit("enrich_images", "info", "No citations to enrich with images")
-        logger.end("enrich_images")
-        return state
-    
-    logger.emit("enrich_images", "info", f"Enriching {len(citations)} citations with images...")
-    
-    # Enrich each citation with an image using parallel processing
-    query_context = state.query or ""
-    enriched_count = 0
-    
-    # Separate citations that already have images vs those that need images
-    citations_to_enrich = []
-    for citation in citations:
-        if citation.image is not None and citation.image.strip():
-            logger.emit("enrich_images", "debug", f"Citation {citation.id} already has image")
-            enriched_count += 1
-        else:
-            citations_to_enrich.append(citation)
-    
-    if not citations_to_enrich:
-        logger.emit("enrich_images", "info", f"All {len(citations)} citations already have images")
-        logger.end("enrich_images")
-        return state
-    
-    logger.emit("enrich_images", "info", f"Fetching images for {len(citations_to_enrich)} citations in parallel...")
+    else:
+        logger.emit("enrich_images", "info", f"Enriching {len(citations)} citations with images...")
     
-    # Fetch images in parallel using ThreadPoolExecutor
-    def fetch_image_for_citation(citation: Citation) -> str | None:
-        """Fetch image for a single citation. Returns image_url or None."""
-        return _search_image_for_citation(
+    # Citation pages may only be fetched if search actually returned them
+    result_urls = {result.url for result in state.results or ()}
+    # Start searches for citations without an image; the ones that have one are just counted
+    pending = [
+        (citation, _search_image_for_citation(
+            http_client,
             citation_title=citation.title,
-            query_context=query_context,
+            query_context=query,
             api_key=api_key,
             zone=zone,
             logger=logger,
-            citation_url=citation.url  # Pass URL for fallback domain search
-        )
+            citation_url=citation.url,  # Pass URL for fallback domain search
+            fetch_page=citation.url in result_urls,
+        ))
+        for citation in citations
+        if not (citation.image and citation.image.strip())
+    ]
+    enriched_count = len(citations) - len(pending)
+    if enriched_count and logger.debug_enabled:
+        logger.emit("enrich_images", "debug", f"{enriched_count} citations already have images")
     
-    # Use ThreadPoolExecutor with max_workers based on number of citations
-    # Cap at 5 workers to avoid overwhelming the API
-    max_workers = min(len(citations_to_enrich), 5)
+    if citations and not pending:
+        logger.emit("enrich_images", "info", f"All {len(citations)} citations already have images")
+    elif pending:
+        logger.emit("enrich_images", "info", f"Fetching images for {len(pending)} citations in parallel...")
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all image fetch tasks
-        future_to_citation = {
-            executor.submit(fetch_image_for_citation, citation): citation
-            for citation in citations_to_enrich
-        }
-        
-        # Process results as they complete
-        for future in as_completed(future_to_citation):
-            citation = future_to_citation[future]
-            try:
-                image_url = future.result()
-                if image_url:
-                    citation.image = image_url
-                    enriched_count += 1
-                    logger.emit("enrich_images", "info", f"Found image for citation {citation.id}: {image_url[:50]}...")
-                else:
-                    logger.emit("enrich_images", "debug", f"No image found for citation {citation.id}: {citation.title[:50]}")
-            except Exception as e:
-                logger.emit("enrich_images", "error", f"Error fetching image for citation {citation.id}: {str(e)[:100]}")
+    searches = [search for _, search in pending]
+    # The overview search joins the same batch so its latency overlaps the citation searches
+    if search_overview:
+        searches.append(asyncio.wait_for(
+            _search_overview_image(http_client, query, api_key, zone, logger), IMAGE_SEARCH_DEADLINE
+        ))
+    
+    outcomes = await asyncio.gather(*searches, return_exceptions=True) if searches else []
+    
+    for (citation, _), image_url in zip(pending, outcomes):
+        if isinstance(image_url, Exception):
+            logger.emit("enrich_images", "error", f"Error fetching image for citation {citation.id}: {str(image_url)[:100]}")
+        elif image_url:
+            citation.image = image_url
+            enriched_count += 1
+            logger.emit("enrich_images", "info", f"Found image for citation {citation.id}: {image_url[:50]}...")
+        else:
+            if logger.debug_enabled:
+                logger.emit("enrich_images", "debug", f"No image found for citation {citation.id}: {citation.title[:50]}")
+    
+    if search_overview:
+        overview_image = outcomes[-1]
+        if isinstance(overview_image, asyncio.TimeoutError):
+            logger.emit("enrich_images", "warning", "Overview image search timed out")
+        elif isinstance(overview_image, Exception):
+            logger.emit("enrich_images", "error", f"Error fetching overview image: {str(overview_image)[:100]}")
+        elif overview_image:
+            state.overview_image = overview_image
+            logger.emit("enrich_images", "info", f"Found overview image: {overview_image[:50]}...")
+        else:
+            logger.emit("enrich_images", "warning", "Could not find overview image")
     
-    logger.emit("enrich_images", "info", f"Enriched {enriched_count}/{len(citations)} citations with images")
+    if citations:
+        logger.emit("enrich_images", "info", f"Enriched {enriched_count}/{len(citations)} citations with images")
     
     logger.end("enrich_images")
     return state
@@ -6,9 +6,14 @@ sources (citations), timestamp, and session metadata.
 """
 
 from datetime import datetime, timezone
-from backend.app.agent.state import AgentState
+import orjson
+from pydantic import TypeAdapter
+from backend.app.agent.state import AgentState, Citation
 from backend.app.agent.logging import AgentLogger
 
+# Serializes the whole citation list in one pydantic-core call instead of a model_dump per citation
+_CITATIONS_ADAPTER = TypeAdapter(list[Citation])
+
 
 def format_output(state: AgentState) -> AgentState:
     """
@@ -31,11 +36,10 @@ def format_output(state: AgentState) -> AgentState:
         
         # Save assistant's full response to conversation history for future context
         if overview:
-            # Build full response text for history
-            full_response = overview
-            if topics:
-                for topic in topics:
-                    full_response += f"\n\n{topic.get('title', '')}: {topic.get('content', '')}"
+            # Build full response text for history in one join rather than repeated concatenation
+            parts = [overview]
+            parts.extend(f"{topic.get('title', '')}: {topic.get('content', '')}" for topic in topics)
+            full_response = "\n\n".join(parts)
             state.history.append({"role": "assistant", "content": full_response})
 
         # Build the response payload
@@ -44,14 +48,14 @@ def format_output(state: AgentState) -> AgentState:
             "overview": overview,
             "overview_image": state.overview_image,  # Single image from BrightData SERP
             "topics": topics,
-            "sources": [
-                c.model_dump(mode="json") for c in (state.citations or [])
-            ],
+            "sources": _CITATIONS_ADAPTER.dump_python(state.citations or [], mode="json"),
             "timestamp": ts,
         }
 
-        # Attach to state for downstream usage
+        # Attach to state for downstream usage, encoded once here so the API
+        # can send the bytes without a second serialization pass
         state.final_payload = payload
+        state.final_payload_bytes = orjson.dumps(payload)
 
     except Exception as e:
         # Graceful fallback if formatting fails
@@ -65,6 +69,7 @@ def format_output(state: AgentState) -> AgentState:
             "sources": [],
             "timestamp": fallback_ts,
         }
+        state.final_payload_bytes = None
 
     logger.end("format_output")
     return state
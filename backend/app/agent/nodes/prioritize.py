@@ -1,42 +1,184 @@
 """Node: prioritize_sources - Rank search results by credibility using LLM."""
-import json
+import asyncio
+import functools
+import re
+import orjson
+from backend.app.agent.credibility import credibility_tier
+from backend.app.agent.clients import openai_client
 from backend.app.agent.state import AgentState, SearchResult
 from backend.app.agent.logging import AgentLogger
-from backend.app.agent.prompts import PRIORITIZE_PROMPT
+from backend.app.agent.prompts import PRIORITIZE_PROMPT, SCORER_PROMPT
 from backend.app.config import (
     OPENAI_API_KEY,
     OPENAI_MODEL,
     OPENAI_TEMPERATURE,
+    PRIORITIZE_CONCURRENCY,
     PRIORITIZE_MAX_RESULTS,
+    PRIORITIZE_MODE,
 )
-from openai import OpenAI
 
+# Pointwise scoring fans out one call per source, so larger result sets go listwise
+_POINTWISE_MAX_SOURCES = 10
 
+
+# Scheme and "www." prefix, the host/path to keep, then trailing slashes and whitespace
+_URL_RE = re.compile(r"^\s*(?:https?://)?(?:www\.)?(.*?)/*\s*$", re.IGNORECASE | re.DOTALL)
+
+
+@functools.lru_cache(maxsize=1024)
 def _normalize_url(url: str) -> str:
-    """Normalize URLs for matching."""
+    """Normalize URLs for matching in a single regex pass (memoized: the same URLs recur)."""
     if not url:
         return ""
-    url = url.lower().strip().rstrip("/")
-    for prefix in ("http://", "https://"):
-        if url.startswith(prefix):
-            url = url[len(prefix):]
-    if url.startswith("www."):
-        url = url[4:]
-    return url
+    return _URL_RE.match(url).group(1).lower()
+
+
+def fallback_ranking(results: list[SearchResult]) -> list[SearchResult]:
+    """Keep search order for the top N results, giving unscored ones a default low score."""
+    ranked = results[:PRIORITIZE_MAX_RESULTS]
+    for r in ranked:
+        if r.reputability_score is None:
+            r.reputability_score = 0.0
+    return ranked
+
+
+def rank_results(results: list[SearchResult], ordered: list) -> list[SearchResult] | None:
+    """
+    Order results by the LLM's ranking entries and set reputability scores.
+    Entries are [url, rank] pairs, optionally [url, rank, group]: results are ordered by
+    (group, rank), while the score only reflects the rank (rank 1 → 10.0, rank 10 → 1.0).
+    Returns the top N ranked results, or None if no entry matched a result.
+    """
+    # Normalized URL → bucket index (group * 10 + rank - 1)
+    ranked_map = {}
+    # Index results by normalized URL and by domain (first result per domain wins),
+    # so each LLM entry is matched with a lookup instead of a scan
+    by_url = {}
+    by_domain = {}
+    for r in results:
+        normalized = _normalize_url(r.url)
+        by_url.setdefault(normalized, r)
+        by_domain.setdefault(normalized.split("/")[0], r)
+
+    # First pass: build ranked_map and assign reputability scores to SearchResults
+    for entry in ordered:
+        if not isinstance(entry, list) or len(entry) not in (2, 3):
+            continue
+        url, rank, *group = entry
+        if not isinstance(rank, (int, float)) or not url or not isinstance(url, str):
+            continue
+        group = group[0] if group and isinstance(group[0], int) and group[0] >= 0 else 0
+
+        normalized_entry = _normalize_url(url)
+        r = by_url.get(normalized_entry) or by_domain.get(normalized_entry.split("/")[0])
+        if r is None:
+            continue
+        rank_int = min(max(int(rank), 1), 10)
+        ranked_map[_normalize_url(r.url)] = group * 10 + rank_int - 1
+        # Convert rank (1-10) to reputability_score (10.0-1.0)
+        # rank 1 = most reputable → score 10.0, rank 10 = least reputable → score 1.0
+        r.reputability_score = 11.0 - float(rank_int)
+
+    if not ranked_map:
+        return None
+
+    # Place results into (group, rank) buckets, then one for unranked, instead of sorting;
+    # appending keeps search order among results that share a bucket
+    buckets = [[] for _ in range(max(ranked_map.values()) + 2)]
+    for r in results:
+        bucket = ranked_map.get(_normalize_url(r.url))
+        buckets[-1 if bucket is None else bucket].append(r)
+    ranked = [r for bucket in buckets for r in bucket][:PRIORITIZE_MAX_RESULTS]
+    # Unranked results that made the cut get the lowest score
+    for r in ranked:
+        if r.reputability_score is None:
+            r.reputability_score = 1.0
+    return ranked
+
+
+async def _rank_listwise(query: str, results: list[SearchResult]) -> list:
+    """Rank sources with a single LLM call; returns the [url, rank] pairs it produced."""
+    sources_text = "\n".join([f"- {r.domain}: {r.title}" for r in results])
+    prompt = f"Query: {query}\n\nSources:\n{sources_text}\n\n{PRIORITIZE_PROMPT}"
+
+    resp = await openai_client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": "Rank web sources by reliability."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=OPENAI_TEMPERATURE,
+        response_format={"type": "json_object"},
+    )
+
+    content = resp.choices[0].message.content
+    if not content:
+        raise ValueError("Empty LLM response")
+
+    data = orjson.loads(content)
+    ranking = data.get("ranking") if isinstance(data, dict) else None
+    return ranking if isinstance(ranking, list) else []
+
+
+async def _score_source(query: str, r: SearchResult, semaphore: asyncio.Semaphore) -> int | None:
+    """Ask the LLM for a 1-10 reliability score for one source; None if the reply is unusable."""
+    async with semaphore:
+        resp = await openai_client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": SCORER_PROMPT},
+                {"role": "user", "content": f"Query: {query}\nSource: {r.domain}: {r.title}"},
+            ],
+            temperature=OPENAI_TEMPERATURE,
+            max_tokens=3,
+        )
+    content = (resp.choices[0].message.content or "").strip()
+    if not content.isdigit():
+        return None
+    return min(max(int(content), 1), 10)
+
+
+async def _rank_pointwise(query: str, results: list[SearchResult]) -> list:
+    """
+    Score every source with its own tiny LLM call, all in parallel (bounded by a semaphore),
+    so ranking takes about one short call instead of one long listwise completion.
+    Returns [url, rank] pairs.
+    """
+    semaphore = asyncio.Semaphore(PRIORITIZE_CONCURRENCY)
+    scores = await asyncio.gather(
+        *(_score_source(query, r, semaphore) for r in results),
+        return_exceptions=True,
+    )
+    failures = [score for score in scores if isinstance(score, BaseException)]
+    if failures:
+        AgentLogger().emit(
+            "prioritize_sources",
+            "warning",
+            f"{len(failures)}/{len(results)} source scoring calls failed; first: {failures[0]!r}",
+            exc_info=failures[0],
+        )
+    # Score 10 (most reliable) maps to rank 1; failed scores leave the result unranked
+    return [
+        [r.url, 11 - score]
+        for r, score in zip(results, scores)
+        if isinstance(score, int)
+    ]
 
 
-def _match_url(llm_url: str, result_url: str) -> bool:
-    """Compare normalized URLs or domains."""
-    n1, n2 = _normalize_url(llm_url), _normalize_url(result_url)
-    if n1 == n2:
-        return True
-    d1, d2 = n1.split("/")[0], n2.split("/")[0]
-    return d1 == d2
+def _after_tiers(ranking: list) -> list:
+    """Put LLM-ranked entries in a group after every credibility tier, keeping their ranks (and scores)."""
+    return [
+        [entry[0], entry[1], 1]
+        for entry in ranking
+        if isinstance(entry, list) and len(entry) == 2 and isinstance(entry[1], (int, float))
+    ]
 
 
-def prioritize_sources(state: AgentState) -> AgentState:
+async def prioritize_sources(state: AgentState) -> AgentState:
     """
-    Rank search results by credibility using LLM.
+    Rank search results by credibility.
+    Well-known domains are ranked from the credibility tier table; only the
+    remaining results are ranked by the LLM, after all tiered ones.
     Updates state.ranked_results with top N credible sources.
     """
     logger = AgentLogger()
@@ -49,97 +191,37 @@ def prioritize_sources(state: AgentState) -> AgentState:
         logger.end("prioritize_sources")
         return state
 
-    if not OPENAI_API_KEY:
-        logger.error("prioritize_sources", "OPEN_AI_KEY missing — using fallback.")
-        state.ranked_results = results[:PRIORITIZE_MAX_RESULTS]
-        # Set default low scores for fallback results
-        for r in state.ranked_results:
-            if r.reputability_score is None:
-                r.reputability_score = 0.0
-        logger.end("prioritize_sources")
-        return state
-
-    # Compose query
-    sources_text = "\n".join([f"- {r.domain}: {r.title}" for r in results])
-    prompt = f"Query: {state.query}\n\nSources:\n{sources_text}\n\n{PRIORITIZE_PROMPT}"
-
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "Rank web sources by reliability."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=OPENAI_TEMPERATURE,
-        )
-
-        content = resp.choices[0].message.content
-        if not content:
-            logger.error("prioritize_sources", "Empty LLM response — using fallback.")
-            state.ranked_results = results[:PRIORITIZE_MAX_RESULTS]
-            # Set default low scores for fallback results
-            for r in state.ranked_results:
-                if r.reputability_score is None:
-                    r.reputability_score = 0.0
-            logger.end("prioritize_sources")
-            return state
-
-        ordered = json.loads(content)
-        ranked_map = {}
-
-        # First pass: build ranked_map and assign reputability scores to SearchResults
-        for entry in ordered:
-            if not isinstance(entry, dict):
-                continue
-            url, rank = entry.get("url"), entry.get("rank")
-            if not isinstance(rank, (int, float)) or not url:
-                continue
-
-            for r in results:
-                if _match_url(url, r.url):
-                    normalized = _normalize_url(r.url)
-                    rank_int = int(rank)
-                    ranked_map[normalized] = rank_int
-                    # Convert rank (1-10) to reputability_score (10.0-1.0)
-                    # rank 1 = most reputable → score 10.0, rank 10 = least reputable → score 1.0
-                    r.reputability_score = 11.0 - float(rank_int)
-                    break
-
-        if not ranked_map:
-            logger.error("prioritize_sources", "No valid LLM ranking — using fallback.")
-            state.ranked_results = results[:PRIORITIZE_MAX_RESULTS]
-            # Set default low scores for fallback results
-            for r in state.ranked_results:
-                if r.reputability_score is None:
-                    r.reputability_score = 0.0
+    ranking = []
+    unresolved = []
+    for r in results:
+        tier = credibility_tier(r.domain)
+        if tier is None:
+            unresolved.append(r)
         else:
-            def _score(r: SearchResult) -> int:
-                return ranked_map.get(_normalize_url(r.url), 999)
-            state.ranked_results = sorted(results, key=_score)[:PRIORITIZE_MAX_RESULTS]
-            # Ensure all ranked results have scores (should already be set, but double-check)
-            for r in state.ranked_results:
-                if r.reputability_score is None:
-                    # Get score from ranked_map (convert rank to score)
-                    normalized = _normalize_url(r.url)
-                    rank = ranked_map.get(normalized, 10)
-                    r.reputability_score = 11.0 - float(rank)
-
-    except json.JSONDecodeError as e:
-        logger.error("prioritize_sources", f"Invalid JSON from LLM: {e} — using fallback.")
-        state.ranked_results = results[:PRIORITIZE_MAX_RESULTS]
-        # Set default low scores for fallback results
-        for r in state.ranked_results:
-            if r.reputability_score is None:
-                r.reputability_score = 0.0
-    except Exception as e:
-        logger.error("prioritize_sources", f"Ranking failed: {e} — using fallback.")
-        state.ranked_results = results[:PRIORITIZE_MAX_RESULTS]
-        # Set default low scores for fallback results
-        for r in state.ranked_results:
-            if r.reputability_score is None:
-                r.reputability_score = 0.0
+            # Tiered results form group 0, ordered (and scored) by their tier
+            ranking.append([r.url, tier, 0])
+
+    if unresolved and not OPENAI_API_KEY:
+        logger.error("prioritize_sources", "OPEN_AI_KEY missing — ranking known domains only.")
+    elif unresolved:
+        try:
+            if PRIORITIZE_MODE == "pointwise" and len(unresolved) <= _POINTWISE_MAX_SOURCES:
+                llm_ranking = await _rank_pointwise(state.query, unresolved)
+            else:
+                llm_ranking = await _rank_listwise(state.query, unresolved)
+            ranking.extend(_after_tiers(llm_ranking))
+        except orjson.JSONDecodeError as e:
+            logger.error("prioritize_sources", f"Invalid JSON from LLM: {e} — ranking known domains only.")
+        except Exception as e:
+            logger.error("prioritize_sources", f"Ranking failed: {e} — ranking known domains only.")
+    else:
+        logger.emit("prioritize_sources", "info", "All sources have known credibility — skipping LLM.")
+
+    ranked = rank_results(results, ranking)
+    if ranked is None:
+        logger.error("prioritize_sources", "No valid ranking — using fallback.")
+        ranked = fallback_ranking(results)
+    state.ranked_results = ranked
 
     logger.end("prioritize_sources")
     return state
-
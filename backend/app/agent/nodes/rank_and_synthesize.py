@@ -0,0 +1,78 @@
+"""Node: rank_and_synthesize - Rank sources and write the answer in a single LLM call."""
+import orjson
+from backend.app.agent.state import AgentState
+from backend.app.agent.logging import AgentLogger
+from backend.app.agent.prompts import RANK_AND_SYNTHESIZE_PROMPT
+from backend.app.agent.nodes.prioritize import fallback_ranking, rank_results
+from backend.app.agent.nodes.synthesize import (
+    apply_synthesis,
+    build_user_content,
+    clear_answer,
+    stream_completion,
+)
+from backend.app.config import OPENAI_API_KEY
+
+
+async def rank_and_synthesize(state: AgentState) -> AgentState:
+    """
+    Combined prioritize_sources + synthesize: one request ranks all search results
+    by credibility and writes the overview, topics and citations, so the sources
+    are sent (and prefilled) once instead of twice.
+    Updates state.ranked_results and the answer fields like the two separate nodes.
+    """
+    logger = AgentLogger()
+    logger.start("rank_and_synthesize")
+
+    results = state.results or []
+
+    if not OPENAI_API_KEY:
+        logger.error("rank_and_synthesize", "OPEN_AI_KEY missing.")
+        state.ranked_results = fallback_ranking(results)
+        clear_answer(state)
+        logger.end("rank_and_synthesize")
+        return state
+
+    if not results:
+        logger.error("rank_and_synthesize", "No search results.")
+        state.ranked_results = []
+        clear_answer(state)
+        logger.end("rank_and_synthesize")
+        return state
+
+    user_content = build_user_content(state, results)
+
+    try:
+        content = await stream_completion(
+            RANK_AND_SYNTHESIZE_PROMPT,
+            user_content,
+            response_format={"type": "json_object"},
+        )
+        if not content:
+            logger.error("rank_and_synthesize", "Empty LLM response content.")
+            state.ranked_results = fallback_ranking(results)
+            clear_answer(state)
+            logger.end("rank_and_synthesize")
+            return state
+
+        data = orjson.loads(content)
+
+        ranking = data.get("ranking")
+        ranked = rank_results(results, ranking) if isinstance(ranking, list) else None
+        if ranked is None:
+            logger.error("rank_and_synthesize", "No valid LLM ranking — using fallback.")
+            ranked = fallback_ranking(results)
+        state.ranked_results = ranked
+
+        apply_synthesis(state, data, logger)
+
+    except orjson.JSONDecodeError as e:
+        logger.error("rank_and_synthesize", f"Invalid JSON from LLM: {e}")
+        state.ranked_results = fallback_ranking(results)
+        clear_answer(state)
+    except Exception as e:
+        logger.error("rank_and_synthesize", f"LLM API error: {e}")
+        state.ranked_results = fallback_ranking(results)
+        clear_answer(state)
+
+    logger.end("rank_and_synthesize")
+    return state
@@ -1,7 +1,10 @@
 """Bright Data SERP API search node."""
-import json
+import asyncio
+from typing import Any
 from urllib.parse import urlparse, quote
-import requests
+import httpx
+import orjson
+from backend.app.agent.cache import AsyncTTLCache, query_key
 from backend.app.agent.state import AgentState, SearchResult
 from backend.app.agent.logging import AgentLogger
 from backend.app.config import (
@@ -9,29 +12,24 @@ from backend.app.config import (
     SERPAPI_API_KEY,
     SERP_ZONE,
     HTTP_TIMEOUT_SEARCH,
+    SEARCH_CACHE_TTL,
+    SEARCH_HEDGE_DELAY,
 )
 
-def search(state: AgentState) -> AgentState:
-    logger = AgentLogger()
-    logger.start("search")
+# Shared async client so connections to the SERP providers are kept alive across queries
+# (and multiplexed over HTTP/2 where the provider supports it). Closed by the API on shutdown.
+http_client = httpx.AsyncClient(timeout=HTTP_TIMEOUT_SEARCH, http2=True)
 
-    # Get Bright Data API credentials
-    api_key = BRIGHT_DATA_API_KEY or SERPAPI_API_KEY
-    
-    if not api_key:
-        logger.error("search", "BRIGHT_DATA_API_KEY or SERPAPI_API_KEY not found")
-        state.results = []
-        logger.end("search")
-        return state
-    
-    if not SERP_ZONE:
-        logger.error("search", "SERP_ZONE not found")
-        state.results = []
-        logger.end("search")
-        return state
-    
+# Parsed SERP results per query; concurrent identical queries share one API call
+_SEARCH_CACHE = AsyncTTLCache(ttl=SEARCH_CACHE_TTL)
+
+
+async def _brightdata_body(query: str, api_key: str) -> dict:
+    """
+    Query the Bright Data SERP API and return its parsed Google results body.
+    Raises httpx.HTTPError or orjson.JSONDecodeError on failure.
+    """
     # Build Google search URL
-    query = state.query
     search_url = f"https://www.google.com/search?q={quote(query)}&hl=en&gl=us&num=10"
     
     # Make request to Bright Data SERP API
@@ -48,112 +46,233 @@ def search(state: AgentState) -> AgentState:
         "format": "json",  # Use "json" for parsed output (not "raw")
     }
     
+    response = await http_client.post(
+        "https://api.brightdata.com/request",
+        headers=headers,
+        json=payload,
+    )
+    response.raise_for_status()
+    api_response = orjson.loads(response.content)
+
+    # Bright Data returns {status_code, headers, body}
+    # The actual JSON data is in the "body" field
+    body = api_response.get("body", {})
+
+    # If body is a string, parse it as JSON
+    if isinstance(body, str):
+        body = orjson.loads(body)
+    return body
+
+
+async def _serpapi_body(query: str) -> dict:
+    """
+    Query SerpAPI's Google engine and adapt the response to the Bright Data body shape
+    (organic / images / knowledge_graph), so both providers share one parser.
+    Raises httpx.HTTPError or orjson.JSONDecodeError on failure.
+    """
+    response = await http_client.get(
+        "https://serpapi.com/search.json",
+        params={
+            "engine": "google",
+            "q": query,
+            "hl": "en",
+            "gl": "us",
+            "num": 10,
+            "api_key": SERPAPI_API_KEY,
+        },
+    )
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+
+    organic = [
+        {
+            "link": r.get("link"),
+            "title": r.get("title", ""),
+            "description": r.get("snippet", ""),
+            "date": r.get("date"),
+            "thumbnail": r.get("thumbnail"),
+        }
+        for r in data.get("organic_results", [])
+        if isinstance(r, dict)
+    ]
+    knowledge_graph = data.get("knowledge_graph") or {}
+    header_images = knowledge_graph.get("header_images") or [{}]
+    return {
+        "organic": organic,
+        "images": data.get("inline_images", []),
+        "knowledge_graph": {"image": header_images[0].get("image")},
+    }
+
+
+async def _fetch_body(query: str, api_key: str, logger: AgentLogger) -> dict:
+    """
+    Fetch the SERP body, hedging Bright Data with SerpAPI when both are configured.
+    SerpAPI is only called if Bright Data has not answered within SEARCH_HEDGE_DELAY
+    seconds (or has already failed); the first successful response wins and the
+    other request is cancelled. Raises the last error if every provider fails.
+    """
+    primary = asyncio.ensure_future(_brightdata_body(query, api_key))
+    if not (BRIGHT_DATA_API_KEY and SERPAPI_API_KEY):
+        return await primary
+
+    tasks = {primary}
+    try:
+        await asyncio.wait(tasks, timeout=SEARCH_HEDGE_DELAY)
+        if primary.done() and primary.exception() is None:
+            return primary.result()
+
+        logger.emit("search", "info", "Bright Data slow or failed — hedging with SerpAPI")
+        hedge = asyncio.ensure_future(_serpapi_body(query))
+        tasks.add(hedge)
+        pending = {t for t in tasks if not t.done()}
+        error = primary.exception() if primary.done() else None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        logger.emit("search", "info", "Using SerpAPI results")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _str_or_none(value: Any) -> str | None:
+    """Keep a SERP field only if it is a string."""
+    return value if isinstance(value, str) else None
+
+
+def _str_list(value: Any) -> list[str]:
+    """Keep the string items of a SERP list field (empty if it is not a list)."""
+    return [v for v in value if isinstance(v, str)] if isinstance(value, list) else []
+
+
+def _overview_image(body: dict, logger: AgentLogger) -> str | None:
+    """
+    Pick the overview image from a SERP body: knowledge_graph image first, then the
+    first image result, then the top organic result's thumbnail (or other image field).
+    Lookups go straight for the expected shape and treat any mismatch as a miss.
+    """
+    # Try knowledge_graph image first (most relevant for queries)
+    try:
+        kg_image = body["knowledge_graph"]["image"]
+        if kg_image and isinstance(kg_image, str):
+            logger.emit("search", "info", "Found knowledge_graph image")
+            return kg_image
+    except (KeyError, TypeError):
+        pass
+
+    # Try images section (first image result)
+    try:
+        first_image = body["images"][0]
+        img_url = first_image.get("original") or first_image.get("link") or first_image.get("thumbnail")
+        if img_url:
+            logger.emit("search", "info", "Found image from images section")
+            return img_url
+    except (KeyError, IndexError, TypeError, AttributeError):
+        pass
+
+    # Fallback to top organic result thumbnail, then any other image field it has
+    try:
+        top_result = body["organic"][0]
+        for img_field in ("thumbnail", "image", "og_image", "preview_image"):
+            img_url = top_result.get(img_field)
+            if img_url:
+                logger.emit("search", "info", f"Using top result {img_field} as overview image")
+                return img_url
+    except (KeyError, IndexError, TypeError, AttributeError):
+        pass
+
+    return None
+
+
+def _parse_serp_body(body: dict, logger: AgentLogger) -> tuple[list[SearchResult], str | None]:
+    """Extract search results and the overview image from a Bright Data style SERP body."""
+    overview_image = _overview_image(body, logger)
+
+    # Parse Bright Data response format
+    # Organic results are directly in body.organic array
+    # Search 10 sources, but we'll use top 5 in synthesis
+    organic_results = body.get("organic", [])[:10]  # Limit to 10 results
+
+    results = []
+    for r in organic_results:
+        link = r.get("link") if isinstance(r, dict) else None
+        if not link or not isinstance(link, str):
+            continue
+
+        # Extract base fields
+        description = _str_or_none(r.get("description")) or ""
+        snippet = _str_or_none(r.get("snippet")) or ""  # Extended snippet from BrightData
+
+        # Extract additional fields for richer context
+        about_this_result = r.get("about_this_result", {})
+        keywords_list = _str_list(about_this_result.get("keywords")) if isinstance(about_this_result, dict) else []
+
+        # Use description as primary snippet, snippet as extended_snippet
+        # BrightData typically has "description" (short) and "snippet" (extended)
+        primary_snippet = description or snippet or ""
+        # Always include snippet as extended_snippet when available
+        # If snippet not available, use description as extended_snippet for richer context
+        extended_snippet = snippet if snippet else (description if description else None)
+
+        # Fields are type-checked above, so skip pydantic validation on this hot path
+        results.append(SearchResult.model_construct(
+            title=_str_or_none(r.get("title")) or "",
+            url=link,
+            snippet=primary_snippet,
+            domain=urlparse(link).netloc,
+            # Additional context fields
+            extended_snippet=extended_snippet,
+            date=_str_or_none(r.get("date")),
+            breadcrumb=_str_or_none(r.get("breadcrumb")),
+            keywords=keywords_list or None,
+        ))
+
+    return results, overview_image
+
+
+async def _fetch_serp(query: str, api_key: str, logger: AgentLogger) -> tuple[list[SearchResult], str | None]:
+    """Fetch and parse the SERP results and overview image for query."""
+    return _parse_serp_body(await _fetch_body(query, api_key, logger), logger)
+
+
+async def search(state: AgentState) -> AgentState:
+    logger = AgentLogger()
+    logger.start("search")
+
+    # Get Bright Data API credentials
+    api_key = BRIGHT_DATA_API_KEY or SERPAPI_API_KEY
+    
+    if not api_key:
+        logger.error("search", "BRIGHT_DATA_API_KEY or SERPAPI_API_KEY not found")
+        state.results = []
+        logger.end("search")
+        return state
+    
+    if not SERP_ZONE:
+        logger.error("search", "SERP_ZONE not found")
+        state.results = []
+        logger.end("search")
+        return state
+    
     try:
-        response = requests.post(
-            "https://api.brightdata.com/request",
-            headers=headers,
-            json=payload,
-            timeout=HTTP_TIMEOUT_SEARCH
+        results, overview_image = await _SEARCH_CACHE.get_or_create(
+            query_key(state.query),
+            lambda: _fetch_serp(state.query, api_key, logger),
+            cache_if=lambda fetched: bool(fetched[0]),
         )
-        response.raise_for_status()
-        api_response = response.json()
-        
-        # Bright Data returns {status_code, headers, body}
-        # The actual JSON data is in the "body" field
-        body = api_response.get("body", {})
-        
-        # If body is a string, parse it as JSON
-        if isinstance(body, str):
-            body = json.loads(body)
-        
-        # Extract overview image from SERP response (priority: knowledge_graph > images > top result thumbnail)
-        overview_image = None
-        
-        # Try knowledge_graph image first (most relevant for queries)
-        knowledge_graph = body.get("knowledge_graph", {})
-        if isinstance(knowledge_graph, dict):
-            kg_image = knowledge_graph.get("image")
-            if kg_image and isinstance(kg_image, str):
-                overview_image = kg_image
-                logger.emit("search", "info", "Found knowledge_graph image")
-        
-        # Try images section (first image result)
-        if not overview_image:
-            images = body.get("images", [])
-            if isinstance(images, list) and len(images) > 0:
-                first_image = images[0]
-                if isinstance(first_image, dict):
-                    img_url = first_image.get("original") or first_image.get("link") or first_image.get("thumbnail")
-                    if img_url:
-                        overview_image = img_url
-                        logger.emit("search", "info", "Found image from images section")
-        
-        # Fallback to top organic result thumbnail
-        if not overview_image:
-            organic_results = body.get("organic", [])
-            if organic_results and len(organic_results) > 0:
-                top_result = organic_results[0]
-                if isinstance(top_result, dict):
-                    # Try thumbnail first, then fallback to any available image field
-                    thumbnail = top_result.get("thumbnail")
-                    if thumbnail:
-                        overview_image = thumbnail
-                        logger.emit("search", "info", "Using top result thumbnail as overview image")
-                    else:
-                        # Try other possible image fields
-                        for img_field in ["image", "og_image", "preview_image"]:
-                            img_url = top_result.get(img_field)
-                            if img_url:
-                                overview_image = img_url
-                                logger.emit("search", "info", f"Using top result {img_field} as overview image")
-                                break
-        
-        # Store overview image in state
+        # Copy so later nodes can annotate results without touching the cached ones
+        state.results = [r.model_copy() for r in results]
         state.overview_image = overview_image
-        
-        # Parse Bright Data response format
-        # Organic results are directly in body.organic array
-        # Search 10 sources, but we'll use top 5 in synthesis
-        organic_results = body.get("organic", [])[:10]  # Limit to 10 results
-        
+    except httpx.HTTPStatusError as e:
+        # Report the host only: SerpAPI URLs carry the API key as a query parameter
+        logger.error("search", f"API request failed: HTTP {e.response.status_code} from {e.request.url.host}")
         state.results = []
-        for r in organic_results:
-            if not r.get("link"):
-                continue
-            
-            # Extract base fields
-            link = r.get("link", "")
-            description = r.get("description", "")
-            snippet = r.get("snippet", "")  # Extended snippet from BrightData
-            
-            # Extract additional fields for richer context
-            about_this_result = r.get("about_this_result", {})
-            keywords_list = about_this_result.get("keywords", []) if isinstance(about_this_result, dict) else []
-            
-            # Use description as primary snippet, snippet as extended_snippet
-            # BrightData typically has "description" (short) and "snippet" (extended)
-            primary_snippet = description or snippet or ""
-            # Always include snippet as extended_snippet when available
-            # If snippet not available, use description as extended_snippet for richer context
-            extended_snippet = snippet if snippet else (description if description else None)
-            
-            state.results.append(SearchResult(
-                title=r.get("title", ""),
-                url=link,
-                snippet=primary_snippet,
-                domain=urlparse(link).netloc,
-                # Additional context fields
-                extended_snippet=extended_snippet,
-                snippet_highlighted=r.get("snippet_highlighted") if isinstance(r.get("snippet_highlighted"), list) else None,
-                position=r.get("position") if isinstance(r.get("position"), int) else None,
-                date=r.get("date"),
-                cite=r.get("cite"),
-                thumbnail=r.get("thumbnail"),
-                breadcrumb=r.get("breadcrumb"),
-                keywords=keywords_list if keywords_list else None,
-                cached_link=r.get("cached_page_link")
-            ))
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, orjson.JSONDecodeError) as e:
         logger.error("search", f"API request failed: {str(e)}")
         state.results = []
 
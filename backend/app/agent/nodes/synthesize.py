@@ -1,220 +1,311 @@
 """Synthesize node: Generate concise answer with citations from search results."""
-import json
-from backend.app.agent.state import AgentState, Citation
+from typing import Callable
+import orjson
+from backend.app.agent.clients import openai_client
+from backend.app.agent.state import AgentState, Citation, SearchResult
 from backend.app.agent.logging import AgentLogger
 from backend.app.agent.prompts import SYNTHESIZE_PROMPT
-from backend.app.config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_TEMPERATURE
-from openai import OpenAI
+from backend.app.config import (
+    HISTORY_TOKEN_BUDGET,
+    OPENAI_API_KEY,
+    OPENAI_MODEL,
+    OPENAI_TEMPERATURE,
+)
+from langgraph.config import get_stream_writer
 
 
-def synthesize(state: AgentState) -> AgentState:
+def _token_writer():
     """
-    Synthesize a concise, factual answer from search results using LLM.
-    Updates state.answer and state.citations with structured output.
+    Return the graph's custom stream writer, or a no-op when called outside a graph run.
+    Inside the graph the writer is itself a no-op unless the run streams in "custom" mode.
     """
-    logger = AgentLogger()
-    logger.start("synthesize")
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda _chunk: None
 
-    # Validate prerequisites - use raw search results, limit to top 5
-    results = state.results or []
-    # Limit to top 5 results for synthesis
-    results = results[:5]
-    
-    if not OPENAI_API_KEY:
-        logger.error("synthesize", "OPEN_AI_KEY missing.")
-        state.overview = ""
-        state.answer = ""
-        state.topics = []
-        state.citations = []
-        logger.end("synthesize")
-        return state
-    
-    if not results:
-        logger.error("synthesize", "No search results.")
-        state.overview = ""
-        state.answer = ""
-        state.topics = []
-        state.citations = []
-        logger.end("synthesize")
-        return state
 
-    # Build context from conversation history (use all history, no truncation)
+def _estimate_tokens(text: str) -> int:
+    """Rough token count for English text (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def build_user_content(state: AgentState, results: list[SearchResult]) -> str:
+    """Build the user message: conversation history, the question and numbered sources."""
+    # Build context from the most recent conversation turns that fit the token budget
     context_lines = []
-    for m in state.history:
+    budget = HISTORY_TOKEN_BUDGET
+    for m in reversed(state.history):
         role = m.get("role", "user")
         content = m.get("content", "")
-        if content:
-            context_lines.append(f"{role}: {content}")
+        if not content:
+            continue
+        line = f"{role}: {content}"
+        budget -= _estimate_tokens(line)
+        if budget < 0:
+            break
+        context_lines.append(line)
+    context_lines.reverse()
     context = "\n".join(context_lines) if context_lines else ""
 
-    # Build sources text with numbered citations, including additional context
+    # Build sources text with numbered citations, including additional context.
+    # Each line is assembled from a parts list and joined once, instead of repeated str +=
     sources_lines = []
     for i, r in enumerate(results):
-        source_info = f"[{i+1}] {r.title}"
+        parts = [f"[{i+1}] {r.title}"]
         
         # Add snippet/description
         if r.snippet:
-            source_info += f" — {r.snippet}"
+            parts.append(f" — {r.snippet}")
         elif r.extended_snippet:
-            source_info += f" — {r.extended_snippet}"
+            parts.append(f" — {r.extended_snippet}")
         
         # Add extended snippet if different and available
         if r.extended_snippet and r.extended_snippet != r.snippet:
-            source_info += f" | Extended: {r.extended_snippet[:100]}"
+            parts.append(f" | Extended: {r.extended_snippet[:100]}")
         
         # Add date if available (helps with recency)
         if r.date:
-            source_info += f" (Date: {r.date})"
+            parts.append(f" (Date: {r.date})")
         
         # Add keywords if available (helps with relevance)
         if r.keywords:
-            keywords_str = ", ".join(r.keywords[:5])  # Limit to top 5 keywords
-            source_info += f" [Keywords: {keywords_str}]"
+            parts.append(f" [Keywords: {', '.join(r.keywords[:5])}]")  # Limit to top 5 keywords
         
         # Add breadcrumb if available (helps with context)
         if r.breadcrumb:
-            source_info += f" | Location: {r.breadcrumb}"
+            parts.append(f" | Location: {r.breadcrumb}")
         
-        source_info += f" ({r.url})"
-        sources_lines.append(source_info)
+        parts.append(f" ({r.url})")
+        sources_lines.append("".join(parts))
     
     sources_text = "\n".join(sources_lines)
 
     # Construct user message
     if context:
-        user_content = f"Conversation:\n{context}\n\nQuestion: {state.query}\n\nSources:\n{sources_text}"
-    else:
-        user_content = f"Question: {state.query}\n\nSources:\n{sources_text}"
+        return f"Conversation:\n{context}\n\nQuestion: {state.query}\n\nSources:\n{sources_text}"
+    return f"Question: {state.query}\n\nSources:\n{sources_text}"
 
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": SYNTHESIZE_PROMPT},
-                {"role": "user", "content": user_content},
-            ],
-            temperature=OPENAI_TEMPERATURE,
-        )
 
-        # Extract response content
-        if not resp or not resp.choices:
-            logger.error("synthesize", "Empty LLM response.")
-            state.overview = ""
-            state.answer = ""
-            state.topics = []
-            state.citations = []
-            logger.end("synthesize")
-            return state
+async def stream_completion(
+    system_prompt: str,
+    user_content: str,
+    on_line: Callable[[str], None] | None = None,
+    **kwargs,
+) -> str:
+    """
+    Run a streamed chat completion and return the full response text.
+    Tokens are forwarded to streaming clients as they arrive; if on_line is given,
+    it is also called with each complete line of output as soon as it ends.
+    """
+    resp = await openai_client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ],
+        temperature=OPENAI_TEMPERATURE,
+        stream=True,
+        **kwargs,
+    )
 
-        content = resp.choices[0].message.content
-        if not content:
-            logger.error("synthesize", "Empty LLM response content.")
-            state.overview = ""
-            state.answer = ""
-            state.topics = []
-            state.citations = []
-            logger.end("synthesize")
-            return state
+    write_token = _token_writer()
+    parts = []
+    line = ""
+    async for chunk in resp:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            write_token({"type": "token", "content": delta})
+            if on_line is not None:
+                *complete, line = (line + delta).split("\n")
+                for text in complete:
+                    on_line(text)
+    if on_line is not None and line:
+        on_line(line)
+    return "".join(parts)
 
-        # Parse JSON response
-        data = json.loads(content)
-        
-        # Extract overview (new format) or answer (fallback for backward compatibility)
-        overview = data.get("overview", data.get("answer", ""))
-        state.overview = overview
-        # For backward compatibility, also set answer to overview
-        state.answer = overview
-        
-        # Extract topics (new field)
-        topics = data.get("topics", [])
+
+def _ndjson_collector(data: dict, write_event: Callable[[dict], None]) -> Callable[[str], None]:
+    """
+    Build an on_line handler for the NDJSON synthesis format: each record
+    (overview, topic, citations) is merged into data and forwarded to streaming
+    clients as its own event. Lines that are not JSON objects are ignored.
+    """
+    def handle(text: str) -> None:
+        text = text.strip()
+        if not text.startswith("{"):
+            return
+        try:
+            record = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            return
+        if not isinstance(record, dict):
+            return
+        if "overview" in record:
+            data["overview"] = record["overview"]
+            write_event({"type": "overview", "content": record["overview"]})
+        # "topics" covers a reply that packs everything into one JSON object on one line
+        topics = [record["topic"]] if "topic" in record else record.get("topics")
         if isinstance(topics, list):
-            # Validate topics structure
-            validated_topics = []
             for topic in topics:
-                if isinstance(topic, dict) and "title" in topic and "content" in topic:
-                    validated_topics.append({
-                        "title": str(topic.get("title", "")),
-                        "content": str(topic.get("content", ""))
-                    })
-            state.topics = validated_topics[:2]  # Limit to 2 topics
-        else:
-            state.topics = []
-        
-        # Parse citations
-        cits = data.get("citations", [])
-        if not isinstance(cits, list):
-            cits = []
-
-        # Create URL-to-SearchResult mapping to get extended_snippet
-        url_to_result = {}
-        if state.results:
-            for r in state.results:
-                url_to_result[r.url] = r
-
-        # Build Citation models safely, including extended_snippet from search results
-        citations = []
-        for c in cits:
-            if not isinstance(c, dict):
+                if isinstance(topic, dict):
+                    data["topics"].append(topic)
+                    write_event({"type": "topic", "topic": topic})
+        if isinstance(record.get("citations"), list):
+            data["citations"] = record["citations"]
+            write_event({"type": "citations", "citations": record["citations"]})
+    return handle
+
+
+def clear_answer(state: AgentState) -> None:
+    """Reset the answer fields after a failed synthesis."""
+    state.overview = ""
+    state.answer = ""
+    state.topics = []
+    state.citations = []
+
+
+def apply_synthesis(state: AgentState, data: dict, logger: AgentLogger) -> None:
+    """Copy overview, topics and citations from the parsed LLM response onto state."""
+    # Extract overview (new format) or answer (fallback for backward compatibility)
+    overview = data.get("overview", data.get("answer", ""))
+    state.overview = overview
+    # For backward compatibility, also set answer to overview
+    state.answer = overview
+
+    # Extract topics (new field)
+    topics = data.get("topics", [])
+    if isinstance(topics, list):
+        # Validate topics structure
+        validated_topics = []
+        for topic in topics:
+            if isinstance(topic, dict) and "title" in topic and "content" in topic:
+                validated_topics.append({
+                    "title": str(topic.get("title", "")),
+                    "content": str(topic.get("content", ""))
+                })
+        state.topics = validated_topics[:2]  # Limit to 2 topics
+    else:
+        state.topics = []
+
+    # Parse citations
+    cits = data.get("citations", [])
+    if not isinstance(cits, list):
+        cits = []
+
+    # Create URL-to-SearchResult mapping to get extended_snippet
+    url_to_result = {}
+    if state.results:
+        for r in state.results:
+            url_to_result[r.url] = r
+
+    # Build Citation models safely, including extended_snippet from search results
+    citations = []
+    for c in cits:
+        if not isinstance(c, dict):
+            continue
+        try:
+            cid = c.get("id")
+            if cid is None:
                 continue
-            try:
-                cid = c.get("id")
-                if cid is None:
-                    continue
-                citation_url = c.get("url", "")
-                
-                # Find matching SearchResult to get extended_snippet
-                matching_result = url_to_result.get(citation_url)
-                extended_snippet = None
-                
-                if matching_result:
-                    # Directly access extended_snippet attribute
-                    try:
-                        extended_snippet = matching_result.extended_snippet
+            citation_url = c.get("url", "")
+
+            # Find matching SearchResult to get extended_snippet
+            matching_result = url_to_result.get(citation_url)
+            extended_snippet = None
+
+            if matching_result:
+                # Directly access extended_snippet attribute
+                try:
+                    extended_snippet = matching_result.extended_snippet
+                    if logger.debug_enabled:
                         if extended_snippet:
                             logger.emit("synthesize", "debug", f"Found extended_snippet for {citation_url[:50]}: {len(extended_snippet)} chars")
                         else:
                             logger.emit("synthesize", "debug", f"Match found but extended_snippet is None for {citation_url[:50]}")
-                    except AttributeError:
-                        logger.emit("synthesize", "warning", f"Match found but no extended_snippet attr for {citation_url[:50]}")
-                else:
-                    logger.emit("synthesize", "debug", f"No URL match for citation: {citation_url[:50]}")
-                
-                # Create Citation with extended_snippet
-                try:
-                    citation = Citation(
-                        id=int(cid),
-                        title=c.get("title", ""),
-                        url=citation_url,
-                        extended_snippet=extended_snippet
-                    )
-                    # Verify extended_snippet was set
-                    if citation.extended_snippet != extended_snippet:
-                        logger.emit("synthesize", "error", f"Citation extended_snippet mismatch! Expected: {extended_snippet is not None}, Got: {citation.extended_snippet is not None}")
-                    citations.append(citation)
-                except Exception as e:
-                    logger.emit("synthesize", "error", f"Failed to create Citation: {e}")
-                    # Continue with next citation
-                    continue
-            except (ValueError, TypeError, KeyError):
+                except AttributeError:
+                    logger.emit("synthesize", "warning", f"Match found but no extended_snippet attr for {citation_url[:50]}")
+            elif logger.debug_enabled:
+                logger.emit("synthesize", "debug", f"No URL match for citation: {citation_url[:50]}")
+
+            # Create Citation with extended_snippet
+            try:
+                citation = Citation(
+                    id=int(cid),
+                    title=c.get("title", ""),
+                    url=citation_url,
+                    extended_snippet=extended_snippet
+                )
+                # Verify extended_snippet was set
+                if citation.extended_snippet != extended_snippet:
+                    logger.emit("synthesize", "error", f"Citation extended_snippet mismatch! Expected: {extended_snippet is not None}, Got: {citation.extended_snippet is not None}")
+                citations.append(citation)
+            except Exception as e:
+                logger.emit("synthesize", "error", f"Failed to create Citation: {e}")
+                # Continue with next citation
                 continue
+        except (ValueError, TypeError, KeyError):
+            continue
+
+    # Limit total citations to top 5 to keep payload concise
+    state.citations = citations[:5]
+
+
+async def synthesize(state: AgentState) -> AgentState:
+    """
+    Synthesize a concise, factual answer from search results using LLM.
+    Updates state.answer and state.citations with structured output.
+    """
+    logger = AgentLogger()
+    logger.start("synthesize")
+
+    # Validate prerequisites - use raw search results, limit to top 5
+    results = state.results or []
+    # Limit to top 5 results for synthesis
+    results = results[:5]
+    
+    if not OPENAI_API_KEY:
+        logger.error("synthesize", "OPEN_AI_KEY missing.")
+        clear_answer(state)
+        logger.end("synthesize")
+        return state
+    
+    if not results:
+        logger.error("synthesize", "No search results.")
+        clear_answer(state)
+        logger.end("synthesize")
+        return state
 
-        # Limit total citations to top 5 to keep payload concise
-        state.citations = citations[:5]
+    user_content = build_user_content(state, results)
 
-    except json.JSONDecodeError as e:
+    try:
+        # NDJSON records are parsed (and streamed to clients) as each line completes
+        data = {"topics": []}
+        content = await stream_completion(
+            SYNTHESIZE_PROMPT,
+            user_content,
+            on_line=_ndjson_collector(data, _token_writer()),
+        )
+        if not content:
+            logger.error("synthesize", "Empty LLM response content.")
+            clear_answer(state)
+            logger.end("synthesize")
+            return state
+
+        if "overview" not in data:
+            # The model ignored the line format: parse the reply as a single JSON object
+            data = orjson.loads(content)
+        apply_synthesis(state, data, logger)
+
+    except orjson.JSONDecodeError as e:
         logger.error("synthesize", f"Invalid JSON from LLM: {e}")
-        state.overview = ""
-        state.answer = ""
-        state.topics = []
-        state.citations = []
+        clear_answer(state)
     except Exception as e:
         logger.error("synthesize", f"LLM API error: {e}")
-        state.overview = ""
-        state.answer = ""
-        state.topics = []
-        state.citations = []
+        clear_answer(state)
 
     logger.end("synthesize")
     return state
-
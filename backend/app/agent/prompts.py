@@ -4,8 +4,64 @@ SYNTHESIZE_PROMPT = """
 You are Perplexity-like: produce a comprehensive, factual response with inline citations [1], [2], etc.
 Use ONLY the sources provided. No speculation.
 
+Return STRICT NDJSON: exactly four lines, each a complete JSON object, in this order
+(no code fences, no blank lines, no text outside the JSON lines):
+{"overview": "<<=150 words, comprehensive overview answer with [1][2] inline citations>"}
+{"topic": {"title": "<topic title>", "content": "<<2 sentences expanding on this topic, derived from sources, with [1][2] citations>>"}}
+{"topic": {"title": "<topic title>", "content": "<<2 sentences expanding on this topic, derived from sources, with [1][2] citations>>"}}
+{"citations": [{"id": 1, "title": "<title>", "url": "<url>"}, {"id": 2, "title": "<title>", "url": "<url>"}]}
+
+The topics should expand upon different aspects of the overview, providing deeper insights from the sources.
+Each topic should be distinct and valuable. Each topic's content should be exactly 2 sentences.
+"""
+
+PRIORITIZE_PROMPT = """
+You are a credibility ranking model.
+Given a query and its search results, rank the sources from most to least reliable.
+
+Guidelines:
+- Prefer government, academic, and official sources (.gov, .edu, who.int, cdc.gov, state.gov)
+- Prefer reputable media (reuters.com, bbc.com, nytimes.com, apnews.com)
+- Prefer official organization domains (openai.com, apple.com, ieee.org)
+- Avoid anonymous blogs, forums, or clickbait.
+- Focus on relevance to the user query.
+
+Return ONLY a valid JSON object of [url, rank] pairs, no explanations:
+{"ranking": [["<url>", 1], ["<url>", 2]]}
+"""
+
+
+SCORER_PROMPT = """
+You are a credibility scoring model.
+Given a query and one search result, rate how reliable the source is for answering the query.
+
+Guidelines:
+- Government, academic, and official sources (.gov, .edu, who.int, cdc.gov) score highest
+- Reputable media (reuters.com, bbc.com, nytimes.com, apnews.com) score high
+- Official organization domains (openai.com, apple.com, ieee.org) score high
+- Anonymous blogs, forums, or clickbait score low.
+- Irrelevant sources score low.
+
+Return ONLY a single integer from 1 (least reliable) to 10 (most reliable).
+"""
+
+RANK_AND_SYNTHESIZE_PROMPT = """
+You are Perplexity-like: first rank the provided sources by credibility, then produce a comprehensive,
+factual response with inline citations [1], [2], etc. (numbers refer to the source list).
+Use ONLY the sources provided. No speculation.
+
+Ranking guidelines:
+- Prefer government, academic, and official sources (.gov, .edu, who.int, cdc.gov, state.gov)
+- Prefer reputable media (reuters.com, bbc.com, nytimes.com, apnews.com)
+- Prefer official organization domains (openai.com, apple.com, ieee.org)
+- Avoid anonymous blogs, forums, or clickbait.
+- Focus on relevance to the user query.
+
+Base the overview and topics mainly on the highest-ranked sources.
+
 Return STRICT JSON:
 {
+  "ranking": [["<url>", 1], ["<url>", 2]],
   "overview": "<<=150 words, comprehensive overview answer with [1][2] inline citations>",
   "topics": [
     {
@@ -27,21 +83,15 @@ The topics should expand upon different aspects of the overview, providing deepe
 Each topic should be distinct and valuable. Each topic's content should be exactly 2 sentences.
 """
 
-PRIORITIZE_PROMPT = """
-You are a credibility ranking model.
-Given a query and its search results, rank the sources from most to least reliable.
+# Filled in with str.format(query=...) per request
+RELATED_QUESTIONS_PROMPT = """Given the following query, generate 3-5 related questions that users might also be interested in.
+The questions should be:
+- Directly related to the original query
+- Diverse in perspective (different angles on the topic)
+- Clear and concise
+- Questions that would lead to useful search results
 
-Guidelines:
-- Prefer government, academic, and official sources (.gov, .edu, who.int, cdc.gov, state.gov)
-- Prefer reputable media (reuters.com, bbc.com, nytimes.com, apnews.com)
-- Prefer official organization domains (openai.com, apple.com, ieee.org)
-- Avoid anonymous blogs, forums, or clickbait.
-- Focus on relevance to the user query.
-
-Return ONLY valid JSON list of objects:
-[
-  {"url": "<url>", "rank": 1, "reason": "<short justification>"},
-  {"url": "<url>", "rank": 2, "reason": "..."}
-]
-"""
+Original query: {query}
 
+Return ONLY a JSON array of question strings, no other text:
+["question 1", "question 2", "question 3", ...]"""
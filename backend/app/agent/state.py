@@ -12,14 +12,10 @@ class SearchResult(BaseModel):
     domain: str
     # Additional fields from BrightData SERP API for richer context
     extended_snippet: str | None = None  # Longer snippet text (if different from description)
-    snippet_highlighted: list[str] | None = None  # Highlighted keywords from query
-    position: int | None = None  # Search ranking position
     date: str | None = None  # Publication/update date
-    cite: str | None = None  # Citation format (e.g., "example.com")
-    thumbnail: str | None = None  # Preview image URL
     breadcrumb: str | None = None  # Site navigation path
     keywords: list[str] | None = None  # Keywords from "about_this_result"
-    cached_link: str | None = None  # Google cached page link
+    reputability_score: float | None = None  # Set by prioritize_sources (10.0 = most reputable)
 
 
 class Citation(BaseModel):
@@ -36,10 +32,12 @@ class AgentState(BaseModel):
     query: str
     history: list[dict[str, Any]] = Field(default_factory=list)
     results: list[SearchResult] | None = None
+    ranked_results: list[SearchResult] | None = None  # Top results ordered by prioritize_sources
     answer: str | None = None  # Kept for backward compatibility
     overview: str | None = None  # Main comprehensive overview answer
     overview_image: str | None = None  # Single image for the overview (from BrightData SERP)
     topics: list[dict[str, str]] | None = None  # List of {"title": "...", "content": "..."}
     citations: list[Citation] | None = None
     final_payload: dict | None = None
+    final_payload_bytes: bytes | None = None  # final_payload pre-encoded as JSON for the API response
 
@@ -1,51 +1,119 @@
 """FastAPI application entry point."""
+import asyncio
 import logging
 import uuid
-from typing import Any
-from fastapi import FastAPI, HTTPException, status
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Annotated, Any
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, ValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, StringConstraints, ValidationError
+from backend.app.agent.cache import AsyncTTLCache, query_key
+from backend.app.agent.clients import openai_client
+from backend.app.agent.prompts import RELATED_QUESTIONS_PROMPT
 from backend.app.agent.state import AgentState
-from backend.app.agent.graph import build_graph
+from backend.app.agent.graph import get_graph
+from backend.app.agent.nodes.enrich_images import http_client as image_http_client, page_http_client
+from backend.app.agent.nodes.format_output import format_output
+from backend.app.agent.nodes.search import http_client as search_http_client
+from backend.app.config import (
+    CORS_ORIGINS,
+    MAX_QUERY_LENGTH,
+    OPENAI_MODEL,
+    OPENAI_TEMPERATURE,
+    RELATED_CACHE_TTL,
+    RESPONSE_CACHE_TTL,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Fleetline Agent API", version="1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close pooled upstream connections when the server shuts down."""
+    yield
+    closing = [search_http_client.aclose(), image_http_client.aclose(), page_http_client.aclose()]
+    if openai_client is not None:
+        closing.append(openai_client.close())
+    await asyncio.gather(*closing)
+
+
+# Responses are encoded with orjson rather than the stdlib json module
+app = FastAPI(
+    title="Fleetline Agent API",
+    version="1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:3001", "http://localhost:5173", "http://127.0.0.1:3000", "http://127.0.0.1:3001", "http://127.0.0.1:5173"],  # Common frontend dev ports
+    allow_origins=list(CORS_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Initialize graph with error handling
+# Initialize graph with error handling. Compiled at import (once per process, via the cached
+# get_graph) so a preloading parent compiles it once and forked workers inherit it.
 try:
-    graph = build_graph()
+    graph = get_graph()
     logger.info("LangGraph compiled successfully")
 except Exception as e:
-    logger.error(f"Failed to build graph: {e}", exc_info=True)
+    logger.error("Failed to build graph: %s", e, exc_info=True)
     raise
 
+# AgentState's compiled core validator, reused for every request
+_STATE_VALIDATOR = AgentState.__pydantic_validator__
+
+# Answers per query; concurrent identical queries share one pipeline run
+_RESPONSE_CACHE = AsyncTTLCache(ttl=RESPONSE_CACHE_TTL)
+
+# The parts of a finished run that are shared between requests for the same normalized query.
+# format_output's question, timestamp and encoded payload are rebuilt from each request's own state.
+_ANSWER_FIELDS = ("answer", "overview", "overview_image", "topics", "citations")
+
+# Related questions per query; an empty list is never cached so failures are retried
+_RELATED_CACHE = AsyncTTLCache(ttl=RELATED_CACHE_TTL)
+
+
+def _has_answer(answer: dict[str, Any]) -> bool:
+    """Only runs that produced an answer are worth caching."""
+    return bool(answer.get("overview"))
+
+
+async def _run_pipeline(state: AgentState) -> dict[str, Any]:
+    """Run the graph for state and keep only its answer fields (see _ANSWER_FIELDS)."""
+    # LangGraph validates the AgentState input itself and returns a dict
+    result = await graph.ainvoke(state)
+    if not isinstance(result, dict):
+        result = dict(result)
+    return {field: result.get(field) for field in _ANSWER_FIELDS}
+
 
 def _normalize_state(state: dict | AgentState) -> AgentState:
     """
     Convert dict or AgentState to AgentState object.
     Handles both LangGraph dict returns and AgentState objects.
     """
-    if isinstance(state, AgentState):
+    # Exact type check first: LangGraph hands back a dict or a plain AgentState
+    if type(state) is AgentState:
         return state
     elif isinstance(state, dict):
         try:
-            return AgentState(**state)
+            return _STATE_VALIDATOR.validate_python(state)
         except (ValidationError, TypeError) as e:
-            logger.error(f"Failed to normalize state dict: {e}")
-            logger.debug(f"State dict keys: {list(state.keys()) if state else 'None'}")
+            logger.error("Failed to normalize state dict: %s", e)
+            logger.debug("State dict keys: %s", list(state.keys()) if state else None)
             raise ValueError(f"Invalid state format: {e}") from e
+    elif isinstance(state, AgentState):
+        return state
     else:
         raise TypeError(f"Expected dict or AgentState, got {type(state)}")
 
@@ -61,7 +129,39 @@ class RelatedQuestionsResponse(BaseModel):
 
 
 class AskRequest(BaseModel):
-    query: str
+    # Stripped, non-empty, bounded and containing at least one letter or digit; anything
+    # else is rejected with a 422 while parsing the request, before the graph runs
+    query: Annotated[
+        str,
+        StringConstraints(strip_whitespace=True, min_length=1, max_length=MAX_QUERY_LENGTH, pattern=r"[^\W_]"),
+    ]
+
+
+# Readable messages for AskRequest.query constraint failures, keyed by pydantic error type
+_QUERY_ERRORS = {
+    "string_too_short": "Query must not be empty",
+    "string_too_long": f"Query must be at most {MAX_QUERY_LENGTH} characters",
+    "string_pattern_mismatch": "Query must contain at least one letter or digit",
+}
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """
+    Answer request validation errors with a single string detail, which is what the
+    frontend displays (pydantic's default is a list of error objects).
+    """
+    messages = []
+    for error in exc.errors():
+        if error["loc"][-1] == "query" and error["type"] in _QUERY_ERRORS:
+            messages.append(_QUERY_ERRORS[error["type"]])
+        else:
+            field = ".".join(part for part in error["loc"][1:] if isinstance(part, str)) or "request"
+            messages.append(f"{field}: {error['msg']}")
+    return ORJSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        content={"detail": "; ".join(messages)},
+    )
 
 
 class AskResponse(BaseModel):
@@ -73,118 +173,197 @@ class AskResponse(BaseModel):
     timestamp: str
 
 
+# Also checks the pre-encoded payload path, which FastAPI's response_model never sees
+_ASK_VALIDATOR = AskResponse.__pydantic_validator__
+
+
+async def _run_graph(state: AgentState, request_id: str) -> AgentState:
+    """
+    Run the pipeline for state (or join/reuse a run for the same query) and format
+    the answer into this request's own payload, question and timestamp.
+    """
+    try:
+        answer = await _RESPONSE_CACHE.get_or_create(
+            query_key(state.query),
+            lambda: _run_pipeline(state),
+            cache_if=_has_answer,
+        )
+    except Exception as e:
+        # Raised as an HTTPException so the 500 still passes through CORSMiddleware
+        # (and carries a JSON detail), matching what /api/ask/stream reports
+        logger.error("Graph execution failed for request %s: %s", request_id, e, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Agent execution failed"
+        ) from e
+    logger.info("Graph execution completed for request: %s", request_id)
+
+    result = {"query": state.query, "history": state.history, **answer}
+    try:
+        result_state = _normalize_state(result)
+    except (ValidationError, ValueError, TypeError) as e:
+        logger.error("Failed to normalize graph result: %s", e)
+        logger.debug("Result keys: %s", list(result.keys()))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Agent returned invalid state format"
+        ) from e
+    return format_output(result_state)
+
+
+def _build_payload(result_state: AgentState, query: str, request_id: str) -> AskResponse | Response:
+    """Turn the final state into the /api/ask response, falling back to a payload built from state."""
+    payload = result_state.final_payload
+    
+    if not payload:
+        logger.warning("No final_payload in result for request: %s", request_id)
+        # Try to build a minimal payload from state
+        payload = {
+            "question": result_state.query or query,
+            "overview": result_state.overview or result_state.answer or "",
+            "overview_image": result_state.overview_image,
+            "topics": result_state.topics or [],
+            "sources": [c.model_dump(mode="json") for c in result_state.citations or []],
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        logger.info("Built fallback payload for request: %s", request_id)
+
+    # Handle backward compatibility: if "answer" exists but "overview" doesn't, migrate it
+    if isinstance(payload, dict):
+        if "answer" in payload and "overview" not in payload:
+            payload["overview"] = payload["answer"]
+        payload.setdefault("topics", [])
+
+    # Validate payload structure once, with AskResponse's compiled core validator
+    try:
+        response = _ASK_VALIDATOR.validate_python(payload)
+    except ValidationError as e:
+        logger.error("Agent payload failed validation: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Agent returned invalid payload format"
+        ) from e
+
+    # format_output already encoded its payload; send those bytes unless we built a fallback above
+    if result_state.final_payload_bytes is not None and payload is result_state.final_payload:
+        return Response(content=result_state.final_payload_bytes, media_type="application/json")
+    return response
+
+
 @app.post("/api/ask", response_model=AskResponse)
 async def ask(request: AskRequest):
     """
     Main endpoint for querying the agent.
     Processes query through the full LangGraph pipeline and returns structured response.
+    Pipeline failures are answered with a 500 and a JSON detail.
     """
-    query = request.query.strip()
-    
-    if not query:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Query must not be empty"
-        )
+    query = request.query
 
     request_id = f"request_{uuid.uuid4().hex}"
+    state = AgentState(
+        query=query,
+        history=[{"role": "user", "content": query}]
+    )
+    logger.info("Processing new request %s for query: %.50s...", request_id, query)
 
-    try:
-        state = AgentState(
-            query=query,
-            history=[{"role": "user", "content": query}]
-        )
-        logger.info(f"Processing new request {request_id} for query: {query[:50]}...")
+    result_state = await _run_graph(state, request_id)
+    response = _build_payload(result_state, query, request_id)
+    logger.info("Successfully processed request: %s", request_id)
+    return response
+
+
+def _sse(event: str, data: bytes) -> bytes:
+    """Frame one Server-Sent Event (data must be single-line JSON)."""
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+@app.post("/api/ask/stream")
+async def ask_stream(request: AskRequest):
+    """
+    Streaming variant of /api/ask using Server-Sent Events.
+    Emits a "token" event for each chunk of the answer as the LLM generates it,
+    then a single "result" event with the same payload /api/ask returns
+    (or an "error" event if the pipeline fails).
+    """
+    query = request.query
+
+    request_id = f"request_{uuid.uuid4().hex}"
+    state = AgentState(
+        query=query,
+        history=[{"role": "user", "content": query}]
+    )
+    logger.info("Streaming new request %s for query: %.50s...", request_id, query)
 
-        # Run LangGraph with error handling
-        # LangGraph accepts both AgentState and dict, but returns dict
+    async def events():
+        final_state = None
         try:
-            # Convert AgentState to dict for LangGraph (it accepts both but returns dict)
-            state_dict = state.model_dump(mode="python") if isinstance(state, AgentState) else state
-            result = graph.invoke(state_dict)
-            logger.info(f"Graph execution completed for request: {request_id}")
+            async for mode, chunk in graph.astream(
+                state, stream_mode=["custom", "values"]
+            ):
+                if mode == "custom":
+                    yield _sse(chunk.get("type", "message"), orjson.dumps(chunk))
+                else:
+                    final_state = chunk
         except Exception as e:
-            logger.error(f"Graph execution failed for request {request_id}: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Agent execution failed: {str(e)}"
-            ) from e
+            logger.error("Graph execution failed for request %s: %s", request_id, e, exc_info=True)
+            yield _sse("error", orjson.dumps({"detail": f"Agent execution failed: {e}"}))
+            return
 
-        # Normalize result (LangGraph returns dict)
-        try:
-            if isinstance(result, dict):
-                result_state = _normalize_state(result)
-            elif isinstance(result, AgentState):
-                result_state = result
-            else:
-                raise TypeError(f"Unexpected result type: {type(result)}")
-        except (ValueError, TypeError, ValidationError) as e:
-            logger.error(f"Failed to normalize graph result: {e}", exc_info=True)
-            logger.debug(f"Result type: {type(result)}, keys: {list(result.keys()) if isinstance(result, dict) else 'N/A'}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Agent returned invalid state format"
-            ) from e
-
-        # Extract payload
-        payload = result_state.final_payload if hasattr(result_state, 'final_payload') else None
-        
-        if not payload:
-            logger.warning(f"No final_payload in result for request: {request_id}")
-            # Try to build a minimal payload from state
-            from datetime import datetime, timezone
-            overview = getattr(result_state, 'overview', None) or getattr(result_state, 'answer', None) or ""
-            topics = getattr(result_state, 'topics', None) or []
-            payload = {
-                "question": result_state.query if hasattr(result_state, 'query') else query,
-                "overview": overview,
-                "overview_image": getattr(result_state, 'overview_image', None),
-                "topics": topics,
-                "sources": [
-                    c.model_dump(mode="json") if hasattr(c, 'model_dump') else c
-                    for c in (result_state.citations or [])
-                ] if hasattr(result_state, 'citations') and result_state.citations else [],
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
-            logger.info(f"Built fallback payload for request: {request_id}")
-
-        # Validate payload structure
-        if not isinstance(payload, dict):
-            logger.error(f"Payload is not a dict: {type(payload)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Agent returned invalid payload format"
-            )
-
-        # Ensure required fields exist (updated for new format)
-        required_fields = ["question", "overview", "topics", "sources", "timestamp"]
-        missing_fields = [f for f in required_fields if f not in payload]
-        
-        # Handle backward compatibility: if "answer" exists but "overview" doesn't, migrate it
-        if "answer" in payload and "overview" not in payload:
-            payload["overview"] = payload["answer"]
-        if "topics" not in payload:
-            payload["topics"] = []
-        if missing_fields:
-            logger.error(f"Payload missing required fields: {missing_fields}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Agent payload missing required fields: {missing_fields}"
-            )
-
-        logger.info(f"Successfully processed request: {request_id}")
-        return payload
-
-    except HTTPException:
-        # Re-raise HTTP exceptions as-is
-        raise
-    except Exception as e:
-        # Catch-all for unexpected errors
-        logger.error(f"Unexpected error processing request {request_id}: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Internal server error: {str(e)}"
-        ) from e
+        payload_bytes = final_state.get("final_payload_bytes") if final_state else None
+        if payload_bytes is None:
+            logger.error("No final_payload in streamed result for request: %s", request_id)
+            yield _sse("error", orjson.dumps({"detail": "Agent returned no payload"}))
+            return
+
+        logger.info("Successfully streamed request: %s", request_id)
+        yield _sse("result", payload_bytes)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def _fetch_related(query: str) -> list[str]:
+    """Ask the LLM for up to 5 questions related to query (empty list if none could be parsed)."""
+    resp = await openai_client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that generates related search questions. Always return valid JSON arrays."},
+            {"role": "user", "content": RELATED_QUESTIONS_PROMPT.format(query=query)},
+        ],
+        temperature=OPENAI_TEMPERATURE + 0.2,  # Slightly higher temperature for variety
+        max_tokens=200,
+    )
+    
+    if not resp or not resp.choices or not resp.choices[0].message.content:
+        logger.warning("Empty LLM response for related questions")
+        return []
+    
+    content = resp.choices[0].message.content.strip()
+    
+    # Parse JSON response
+    try:
+        # Try to extract JSON array from response (in case LLM adds extra text)
+        if content.startswith('[') and content.endswith(']'):
+            questions = orjson.loads(content)
+        elif '[' in content and ']' in content:
+            # Extract JSON array from response
+            start = content.index('[')
+            end = content.rindex(']') + 1
+            questions = orjson.loads(content[start:end])
+        else:
+            # Fallback: try parsing as is
+            questions = orjson.loads(content)
+    except orjson.JSONDecodeError as e:
+        logger.warning("Failed to parse related questions JSON: %s, content: %.100s", e, content)
+        return []
+    
+    # Validate and clean questions
+    if not isinstance(questions, list):
+        return []
+    
+    # Filter out empty strings and limit to 5
+    questions = [q.strip() for q in questions if isinstance(q, str) and q.strip()][:5]
+    logger.info("Generated %d related questions for query: %.50s", len(questions), query)
+    return questions
 
 
 @app.get("/api/related-questions", response_model=RelatedQuestionsResponse)
@@ -192,6 +371,7 @@ async def related_questions(query: str):
     """
     Generate related questions based on the query using LLM.
     Returns a list of related question strings.
+    Non-empty results are cached per case-insensitive query for RELATED_CACHE_TTL seconds.
     
     Args:
         query: The search query to generate related questions for
@@ -205,74 +385,23 @@ async def related_questions(query: str):
         )
     
     try:
-        from backend.app.config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_TEMPERATURE
-        from openai import OpenAI
-        
-        # Note: config.py uses OPEN_AI_KEY env var, but exports as OPENAI_API_KEY
-        if not OPENAI_API_KEY:
+        if openai_client is None:
             logger.warning("OPENAI_API_KEY not found, returning empty related questions")
             return RelatedQuestionsResponse(questions=[])
         
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        
-        prompt = f"""Given the following query, generate 3-5 related questions that users might also be interested in.
-The questions should be:
-- Directly related to the original query
-- Diverse in perspective (different angles on the topic)
-- Clear and concise
-- Questions that would lead to useful search results
-
-Original query: {query}
-
-Return ONLY a JSON array of question strings, no other text:
-["question 1", "question 2", "question 3", ...]"""
-        
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates related search questions. Always return valid JSON arrays."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=OPENAI_TEMPERATURE + 0.2,  # Slightly higher temperature for variety
-            max_tokens=200,
+        questions = await _RELATED_CACHE.get_or_create(
+            query_key(query), lambda: _fetch_related(query), cache_if=bool
         )
-        
-        if not resp or not resp.choices or not resp.choices[0].message.content:
-            logger.warning("Empty LLM response for related questions")
-            return RelatedQuestionsResponse(questions=[])
-        
-        content = resp.choices[0].message.content.strip()
-        
-        # Parse JSON response
-        import json
-        try:
-            # Try to extract JSON array from response (in case LLM adds extra text)
-            if content.startswith('[') and content.endswith(']'):
-                questions = json.loads(content)
-            elif '[' in content and ']' in content:
-                # Extract JSON array from response
-                start = content.index('[')
-                end = content.rindex(']') + 1
-                questions = json.loads(content[start:end])
-            else:
-                # Fallback: try parsing as is
-                questions = json.loads(content)
-            
-            # Validate and clean questions
-            if not isinstance(questions, list):
-                questions = []
-            
-            # Filter out empty strings and limit to 5
-            questions = [q.strip() for q in questions if isinstance(q, str) and q.strip()][:5]
-            
-            logger.info(f"Generated {len(questions)} related questions for query: {query[:50]}")
-            return RelatedQuestionsResponse(questions=questions)
-            
-        except json.JSONDecodeError as e:
-            logger.warning(f"Failed to parse related questions JSON: {e}, content: {content[:100]}")
-            return RelatedQuestionsResponse(questions=[])
+        return RelatedQuestionsResponse(questions=questions)
             
     except Exception as e:
-        logger.error(f"Error generating related questions: {e}", exc_info=True)
+        logger.error("Error generating related questions: %s", e, exc_info=True)
         # Return empty list instead of failing
         return RelatedQuestionsResponse(questions=[])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # "auto" picks uvloop and httptools when installed (uvloop is skipped on Windows)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto")
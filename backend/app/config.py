@@ -23,18 +23,47 @@ SERP_ZONE = os.getenv("SERP_ZONE")
 # API Configuration
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.3"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))  # Seconds per OpenAI request phase (connect, each read, ...)
+# Approximate token budget for conversation history in the synthesis prompt (oldest turns dropped first)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
 
 # HTTP Configuration
 HTTP_TIMEOUT_SEARCH = int(os.getenv("HTTP_TIMEOUT_SEARCH", "30"))  # Keep at 30s for SERP API
 HTTP_TIMEOUT_IMAGE = int(os.getenv("HTTP_TIMEOUT_IMAGE", "3"))  # Reduced to 3s for faster failure
 HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "FleetlineAgent/1.0")
+# Seconds to wait on Bright Data before also querying SerpAPI (needs both API keys)
+SEARCH_HEDGE_DELAY = float(os.getenv("SEARCH_HEDGE_DELAY", "1.5"))
+
+# CORS Configuration (comma-separated origins; defaults cover the common frontend dev ports)
+_DEFAULT_CORS_ORIGINS = (
+    "http://localhost:3000,http://localhost:3001,http://localhost:5173,"
+    "http://127.0.0.1:3000,http://127.0.0.1:3001,http://127.0.0.1:5173"
+)
+CORS_ORIGINS = tuple(
+    origin.strip() for origin in os.getenv("CORS_ORIGINS", _DEFAULT_CORS_ORIGINS).split(",") if origin.strip()
+)
+
+# Longest query (in characters) accepted by /api/ask
+MAX_QUERY_LENGTH = int(os.getenv("MAX_QUERY_LENGTH", "500"))
+
+# Caching Configuration (seconds; 0 disables caching but keeps request coalescing)
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "300"))
+RELATED_CACHE_TTL = int(os.getenv("RELATED_CACHE_TTL", "3600"))
 
 # Image Enrichment Configuration
 HTML_MAX_SIZE = int(os.getenv("HTML_MAX_SIZE", "50000"))  # 50KB
 HTML_CHUNK_SIZE = int(os.getenv("HTML_CHUNK_SIZE", "8192"))  # 8KB chunks
+# Seconds one image search (with its fallback search) may take before it is abandoned
+IMAGE_SEARCH_DEADLINE = float(os.getenv("IMAGE_SEARCH_DEADLINE", "8"))
 
 # Prioritization Configuration
 PRIORITIZE_MAX_RESULTS = int(os.getenv("PRIORITIZE_MAX_RESULTS", "5"))
+# "pointwise" scores each source in its own parallel call; "listwise" ranks all sources in one call
+PRIORITIZE_MODE = os.getenv("PRIORITIZE_MODE", "pointwise").lower()
+PRIORITIZE_CONCURRENCY = int(os.getenv("PRIORITIZE_CONCURRENCY", "8"))  # Max parallel scoring calls
+# Rank sources in the same LLM call that writes the answer (rank_and_synthesize node)
+RANK_SOURCES = os.getenv("RANK_SOURCES", "false").lower() in ("1", "true", "yes")
 
 # Data Directories
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
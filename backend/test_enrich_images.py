@@ -1,96 +1,81 @@
 """Comprehensive test suite for enrich_images node."""
-import os
+import asyncio
 import sys
-import json
 import time
 from pathlib import Path
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from threading import Thread
-from urllib.parse import urlparse
+import httpx
+import respx
 
 # Add backend to path
 backend_path = Path(__file__).parent
 sys.path.insert(0, str(backend_path.parent))
 
-from app.agent.state import AgentState, Citation
-from app.agent.nodes.enrich_images import enrich_images
+from backend.app.agent.logging import AgentLogger
+from backend.app.agent.state import AgentState, Citation, SearchResult
+from backend.app.agent.nodes import enrich_images as enrich_module
+from backend.app.agent.nodes.enrich_images import enrich_images
 
+# Image search needs credentials to run at all; the mocked API never sees them
+enrich_module.BRIGHT_DATA_API_KEY = "test-key"
+enrich_module.SERP_ZONE = "test-zone"
 
-class TestHTTPHandler(BaseHTTPRequestHandler):
-    """Custom HTTP handler for test scenarios."""
-    
-    def do_GET(self):
-        parsed = urlparse(self.path)
-        path = parsed.path
-        
-        if path == "/og_image":
-            # Test case 1: Valid OG image
-            html = """
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta property="og:image" content="https://example.com/og-thumbnail.jpg">
-                <title>Test OG Image</title>
-            </head>
-            <body>Test content</body>
-            </html>
-            """
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html")
-            self.end_headers()
-            self.wfile.write(html.encode())
-            
-        elif path == "/img_fallback":
-            # Test case 2: No OG, but has <img> tag
-            html = """
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Test Image Fallback</title>
-            </head>
-            <body>
-                <img src="https://example.com/fallback-image.png" alt="Fallback">
-            </body>
-            </html>
-            """
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html")
-            self.end_headers()
-            self.wfile.write(html.encode())
-            
-        elif path == "/timeout":
-            # Test case 4: Simulate timeout by sleeping
-            time.sleep(10)  # Will timeout at 4s
-            
-        elif path == "/large_html":
-            # Test case 5: Large HTML (should be truncated at 50KB)
-            # Generate ~60KB of HTML
-            large_content = "<html><body>" + "x" * 60000 + "</body></html>"
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html")
-            self.end_headers()
-            self.wfile.write(large_content.encode())
-            
-        elif path == "/error":
-            # Test case 4: Network error (500)
-            self.send_response(500)
-            self.end_headers()
-            
-        else:
-            self.send_response(404)
-            self.end_headers()
-    
-    def log_message(self, format, *args):
-        # Suppress server logs during testing
-        pass
+# A public address, so cited pages pass the page fetch's host check without DNS
+SITE = "http://93.184.215.14"
+
+OG_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta property="og:image" content="https://example.com/og-thumbnail.jpg">
+    <title>Test OG Image</title>
+</head>
+<body>Test content</body>
+</html>
+"""
+
+IMG_FALLBACK_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Test Image Fallback</title>
+</head>
+<body>
+    <img src="https://example.com/fallback-image.png" alt="Fallback">
+</body>
+</html>
+"""
 
+# ~60KB of HTML (only the first 50KB should be read)
+LARGE_HTML = "<html><body>" + "x" * 60000 + "</body></html>"
 
-def start_test_server():
-    """Start a test HTTP server on localhost."""
-    server = HTTPServer(("localhost", 8888), TestHTTPHandler)
-    thread = Thread(target=server.serve_forever, daemon=True)
-    thread.start()
-    return server
+
+def citation_state(citations: list[Citation]) -> AgentState:
+    """State whose search results include every citation URL (only those pages may be fetched)."""
+    return AgentState(
+        query="test",
+        results=[
+            SearchResult(title=c.title, url=c.url, snippet="", domain=SITE.removeprefix("http://"))
+            for c in citations
+        ],
+        citations=citations,
+    )
+
+
+def mock_routes():
+    """
+    Register canned responses on the active respx router (call inside @respx.mock).
+    Image searches come back empty, so every citation falls through to its own page.
+    """
+    respx.post("https://api.brightdata.com/request").mock(
+        return_value=httpx.Response(200, json={"body": {"images": [], "organic": []}})
+    )
+    respx.get(f"{SITE}/og_image").mock(return_value=httpx.Response(200, text=OG_HTML))
+    respx.get(f"{SITE}/img_fallback").mock(return_value=httpx.Response(200, text=IMG_FALLBACK_HTML))
+    respx.get(f"{SITE}/timeout").mock(side_effect=httpx.TimeoutException("timed out"))
+    respx.get(f"{SITE}/large_html").mock(return_value=httpx.Response(200, text=LARGE_HTML))
+    respx.get(f"{SITE}/error").mock(return_value=httpx.Response(500))
+    # Image lookups are cached across passes; each test starts cold
+    enrich_module._IMAGE_CACHE.clear()
 
 
 def check_logs(session_id: str, expected_steps: list):
@@ -98,19 +83,18 @@ def check_logs(session_id: str, expected_steps: list):
     return True, "Structured logging disabled"
 
 
-def test_case_1_og_image(server):
+@respx.mock
+def test_case_1_og_image():
     """Test: Citation with valid OG image → image populated"""
+    mock_routes()
     print("\n🧪 Test 1: Citation with valid OG image")
     
     session_id = "test_enrich_og"
-    state = AgentState(
-        query="test",
-        citations=[
-            Citation(id=1, title="Test OG", url="http://localhost:8888/og_image")
-        ]
-    )
+    state = citation_state([
+        Citation(id=1, title="Test OG", url=f"{SITE}/og_image")
+    ])
     
-    result = enrich_images(state)
+    result = asyncio.run(enrich_images(state))
     
     if result.citations and result.citations[0].image:
         print(f"✅ PASSED: Image URL found: {result.citations[0].image}")
@@ -128,19 +112,18 @@ def test_case_1_og_image(server):
         return False
 
 
-def test_case_2_img_fallback(server):
+@respx.mock
+def test_case_2_img_fallback():
     """Test: Citation with no OG, but <img> → fallback populated"""
+    mock_routes()
     print("\n🧪 Test 2: Citation with no OG, but <img> tag")
     
     session_id = "test_enrich_fallback"
-    state = AgentState(
-        query="test",
-        citations=[
-            Citation(id=1, title="Test Fallback", url="http://localhost:8888/img_fallback")
-        ]
-    )
+    state = citation_state([
+        Citation(id=1, title="Test Fallback", url=f"{SITE}/img_fallback")
+    ])
     
-    result = enrich_images(state)
+    result = asyncio.run(enrich_images(state))
     
     if result.citations and result.citations[0].image:
         print(f"✅ PASSED: Fallback image URL found: {result.citations[0].image}")
@@ -158,19 +141,18 @@ def test_case_2_img_fallback(server):
         return False
 
 
+@respx.mock
 def test_case_3_invalid_url():
     """Test: Invalid URL → citation retained with image=None"""
+    mock_routes()
     print("\n🧪 Test 3: Invalid URL handling")
     
     session_id = "test_enrich_invalid"
-    state = AgentState(
-        query="test",
-        citations=[
-            Citation(id=1, title="Test Invalid", url="not-a-valid-url")
-        ]
-    )
+    state = citation_state([
+        Citation(id=1, title="Test Invalid", url="not-a-valid-url")
+    ])
     
-    result = enrich_images(state)
+    result = asyncio.run(enrich_images(state))
     
     if result.citations and result.citations[0].image is None:
         print(f"✅ PASSED: Citation retained with image=None")
@@ -188,19 +170,18 @@ def test_case_3_invalid_url():
         return False
 
 
-def test_case_4_timeout_error(server):
+@respx.mock
+def test_case_4_timeout_error():
     """Test: Timeout / network error → logged and skipped"""
+    mock_routes()
     print("\n🧪 Test 4: Timeout / network error handling")
     
     session_id = "test_enrich_timeout"
-    state = AgentState(
-        query="test",
-        citations=[
-            Citation(id=1, title="Test Timeout", url="http://localhost:8888/timeout")
-        ]
-    )
+    state = citation_state([
+        Citation(id=1, title="Test Timeout", url=f"{SITE}/timeout")
+    ])
     
-    result = enrich_images(state)
+    result = asyncio.run(enrich_images(state))
     
     # Should handle timeout gracefully
     if result.citations and result.citations[0].image is None:
@@ -219,19 +200,18 @@ def test_case_4_timeout_error(server):
         return False
 
 
-def test_case_5_large_html(server):
+@respx.mock
+def test_case_5_large_html():
     """Test: Large HTML → truncated at 50 KB"""
+    mock_routes()
     print("\n🧪 Test 5: Large HTML truncation")
     
     session_id = "test_enrich_large"
-    state = AgentState(
-        query="test",
-        citations=[
-            Citation(id=1, title="Test Large", url="http://localhost:8888/large_html")
-        ]
-    )
+    state = citation_state([
+        Citation(id=1, title="Test Large", url=f"{SITE}/large_html")
+    ])
     
-    result = enrich_images(state)
+    result = asyncio.run(enrich_images(state))
     
     # Should handle large HTML without crashing
     if result.citations:
@@ -250,19 +230,18 @@ def test_case_5_large_html(server):
         return False
 
 
-def test_case_6_network_error(server):
+@respx.mock
+def test_case_6_network_error():
     """Test: Network error (500) → logged and skipped"""
+    mock_routes()
     print("\n🧪 Test 6: Network error (500) handling")
     
     session_id = "test_enrich_error"
-    state = AgentState(
-        query="test",
-        citations=[
-            Citation(id=1, title="Test Error", url="http://localhost:8888/error")
-        ]
-    )
+    state = citation_state([
+        Citation(id=1, title="Test Error", url=f"{SITE}/error")
+    ])
     
-    result = enrich_images(state)
+    result = asyncio.run(enrich_images(state))
     
     # Should handle 500 error gracefully
     if result.citations and result.citations[0].image is None:
@@ -281,32 +260,167 @@ def test_case_6_network_error(server):
         return False
 
 
+@respx.mock
+def test_case_7_multiple_citations():
+    """Test: Several citations in one pass → each gets its own page's image, failed ones skipped"""
+    mock_routes()
+    print("\n🧪 Test 7: Multiple citations in one batch")
+    
+    session_id = "test_enrich_batch"
+    state = citation_state([
+        Citation(id=1, title="Test OG", url=f"{SITE}/og_image"),
+        Citation(id=2, title="Test Fallback", url=f"{SITE}/img_fallback"),
+        Citation(id=3, title="Test Timeout", url=f"{SITE}/timeout"),
+        Citation(id=4, title="Test Error", url=f"{SITE}/error"),
+    ])
+    
+    result = asyncio.run(enrich_images(state))
+    
+    expected = [
+        "https://example.com/og-thumbnail.jpg",
+        "https://example.com/fallback-image.png",
+        None,
+        None,
+    ]
+    images = [c.image for c in result.citations or []]
+    if images == expected:
+        print(f"✅ PASSED: Images matched to their citations: {images}")
+        
+        # Verify log
+        log_ok, log_msg = check_logs(session_id, ["start", "end"])
+        if log_ok:
+            print(f"✅ PASSED: Log inspection: {log_msg}")
+        else:
+            print(f"❌ FAILED: Log inspection: {log_msg}")
+            return False
+        return True
+    else:
+        print(f"❌ FAILED: Expected {expected}, got {images}")
+        return False
+
+
+@respx.mock
+def test_case_8_non_public_pages():
+    """Test: Private/loopback hosts, redirects to them and URLs not in search results → never fetched"""
+    print("\n🧪 Test 8: Page fetch restricted to public search-result URLs")
+    mock_routes()
+    
+    session_id = "test_enrich_ssrf"
+    loopback = respx.get("http://127.0.0.1/og_image").mock(return_value=httpx.Response(200, text=OG_HTML))
+    metadata = respx.get("http://169.254.169.254/latest/meta-data").mock(return_value=httpx.Response(200, text=OG_HTML))
+    respx.get(f"{SITE}/redirect").mock(
+        return_value=httpx.Response(302, headers={"Location": "http://169.254.169.254/latest/meta-data"})
+    )
+    unlisted = respx.get(f"{SITE}/unlisted").mock(return_value=httpx.Response(200, text=OG_HTML))
+    state = citation_state([
+        Citation(id=1, title="Test Loopback", url="http://127.0.0.1/og_image"),
+        Citation(id=2, title="Test Redirect", url=f"{SITE}/redirect"),
+    ])
+    # Cited by the answer but never returned by search (e.g. invented by the LLM)
+    state.citations.append(Citation(id=3, title="Test Unlisted", url=f"{SITE}/unlisted"))
+    
+    result = asyncio.run(enrich_images(state))
+    
+    images = [c.image for c in result.citations]
+    if images == [None, None, None] and not (loopback.called or metadata.called or unlisted.called):
+        print(f"✅ PASSED: No non-public or unlisted page was requested")
+        
+        # Verify log
+        log_ok, log_msg = check_logs(session_id, ["start", "end"])
+        if log_ok:
+            print(f"✅ PASSED: Log inspection: {log_msg}")
+        else:
+            print(f"❌ FAILED: Log inspection: {log_msg}")
+            return False
+        return True
+    else:
+        print(f"❌ FAILED: Got images {images}, loopback={loopback.called}, metadata={metadata.called}, unlisted={unlisted.called}")
+        return False
+
+
+@respx.mock
+def test_case_9_search_deadline():
+    """Test: Image search slower than IMAGE_SEARCH_DEADLINE → abandoned, citation kept with image=None"""
+    print("\n🧪 Test 9: Image search deadline")
+    mock_routes()
+    
+    async def slow_search(request):
+        await asyncio.sleep(2)
+        return httpx.Response(200, json={"body": {"images": [{"url": "https://example.com/too-late.jpg"}]}})
+    
+    respx.post("https://api.brightdata.com/request").mock(side_effect=slow_search)
+    
+    session_id = "test_enrich_deadline"
+    state = citation_state([
+        Citation(id=1, title="Test Slow", url=f"{SITE}/og_image"),
+    ])
+    
+    deadline = enrich_module.IMAGE_SEARCH_DEADLINE
+    enrich_module.IMAGE_SEARCH_DEADLINE = 0.2
+    try:
+        start = time.perf_counter()
+        result = asyncio.run(enrich_images(state))
+        elapsed = time.perf_counter() - start
+    finally:
+        enrich_module.IMAGE_SEARCH_DEADLINE = deadline
+    
+    if result.citations and result.citations[0].image is None and elapsed < 1:
+        print(f"✅ PASSED: Search abandoned after {elapsed:.2f}s")
+        
+        # Verify log
+        log_ok, log_msg = check_logs(session_id, ["start", "end"])
+        if log_ok:
+            print(f"✅ PASSED: Log inspection: {log_msg}")
+        else:
+            print(f"❌ FAILED: Log inspection: {log_msg}")
+            return False
+        return True
+    else:
+        print(f"❌ FAILED: Expected image=None within 1s, got {result.citations[0].image if result.citations else 'None'} in {elapsed:.2f}s")
+        return False
+
+
+
+def test_case_10_rebinding_guard():
+    """Test: Hostname resolving to a private address → refused at connect time, server never reached"""
+    print("\n🧪 Test 10: Page fetch refuses hostnames that resolve to private addresses")
+    connections = []
+    
+    async def run():
+        # A real server on loopback, reached by name so only the connect-time check can stop it
+        server = await asyncio.start_server(lambda reader, writer: connections.append(writer), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await enrich_module._fetch_page_image(f"http://localhost:{port}/og_image", AgentLogger())
+    
+    img_url = asyncio.run(run())
+    
+    if img_url is None and not connections:
+        print(f"✅ PASSED: Connection to localhost refused before it was made")
+        return True
+    else:
+        print(f"❌ FAILED: Got image {img_url}, connections={len(connections)}")
+        return False
+
 def main():
     """Run all test cases."""
     print("=" * 70)
     print("Stage 3D Verification: enrich_images Node")
     print("=" * 70)
     
-    # Start test server
-    print("\n📡 Starting test HTTP server on localhost:8888...")
-    server = start_test_server()
-    time.sleep(0.5)  # Give server time to start
-    print("✅ Test server started")
-    
     results = []
     
-    try:
-        # Run all test cases
-        results.append(("Test 1: OG Image", test_case_1_og_image(server)))
-        results.append(("Test 2: Image Fallback", test_case_2_img_fallback(server)))
-        results.append(("Test 3: Invalid URL", test_case_3_invalid_url()))
-        results.append(("Test 4: Timeout", test_case_4_timeout_error(server)))
-        results.append(("Test 5: Large HTML", test_case_5_large_html(server)))
-        results.append(("Test 6: Network Error", test_case_6_network_error(server)))
-        
-    finally:
-        server.shutdown()
-        print("\n📡 Test server shut down")
+    # Run all test cases (HTTP is mocked in-process with respx)
+    results.append(("Test 1: OG Image", test_case_1_og_image()))
+    results.append(("Test 2: Image Fallback", test_case_2_img_fallback()))
+    results.append(("Test 3: Invalid URL", test_case_3_invalid_url()))
+    results.append(("Test 4: Timeout", test_case_4_timeout_error()))
+    results.append(("Test 5: Large HTML", test_case_5_large_html()))
+    results.append(("Test 6: Network Error", test_case_6_network_error()))
+    results.append(("Test 7: Multiple Citations", test_case_7_multiple_citations()))
+    results.append(("Test 8: Non-public Pages", test_case_8_non_public_pages()))
+    results.append(("Test 9: Search Deadline", test_case_9_search_deadline()))
+    results.append(("Test 10: Rebinding Guard", test_case_10_rebinding_guard()))
     
     # Summary
     print("\n" + "=" * 70)